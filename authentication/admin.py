@@ -2,10 +2,13 @@ from django import forms
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
 from django.contrib.auth.forms import UserCreationForm, UserChangeForm
+from django.template.response import TemplateResponse
 from django.utils.safestring import mark_safe
 from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
-from .models import User, OTP
+from .models import User, OTP, SMSOutbox, RevokedToken, TokenFamily
+from .otp_store import get_otp_store
+from .services import TokenService
 
 
 class CustomUserCreationForm(UserCreationForm):
@@ -55,6 +58,12 @@ class UserAdmin(BaseUserAdmin):
     )
 
     readonly_fields = ['last_login', 'date_joined']
+    actions = ['logout_all_devices']
+
+    @admin.action(description=_('Log out of all devices'))
+    def logout_all_devices(self, request, queryset):
+        revoked = TokenService.revoke_all_for_users(queryset.values_list('pk', flat=True))
+        self.message_user(request, _('%(count)d sessions revoked.') % {'count': revoked})
 
 
 @admin.register(OTP)
@@ -64,6 +73,35 @@ class OTPAdmin(admin.ModelAdmin):
     search_fields = ['phone_number']
     ordering = ['-created_at']
     readonly_fields = ['created_at']
+
+    def has_add_permission(self, request):
+        return get_otp_store().uses_model and super().has_add_permission(request)
+
+    def changelist_view(self, request, extra_context=None):
+        otp_store = get_otp_store()
+
+        if otp_store.uses_model:
+            return super().changelist_view(request, extra_context)
+
+        query = request.GET.get('q', '').strip()
+        entries = [
+            entry for entry in otp_store.entries()
+            if not query or query in entry.phone_number
+        ]
+
+        context = {
+            **self.admin_site.each_context(request),
+            'title': _('OTPs'),
+            'opts': self.model._meta,
+            'query': query,
+            'store_name': type(otp_store).__name__,
+            'rows': [
+                (entry, self.validity_status(entry), self.time_remaining(entry))
+                for entry in entries
+            ],
+            **(extra_context or {}),
+        }
+        return TemplateResponse(request, 'admin/authentication/otp/store_changelist.html', context)
     
     def validity_status(self, obj):
         if obj.is_valid():
@@ -92,3 +130,43 @@ class OTPAdmin(admin.ModelAdmin):
         
         return mark_safe(f'<span style="color: blue;">{_("Expires in")}: {minutes_to_expiry}m {seconds_to_expiry}s</span>')
     time_remaining.short_description = _('Time Info')
+
+
+@admin.register(SMSOutbox)
+class SMSOutboxAdmin(admin.ModelAdmin):
+    list_display = ['phone_number', 'status', 'attempts', 'error_type', 'created_at', 'sent_at']
+    list_filter = ['status', 'error_type', 'created_at']
+    search_fields = ['phone_number', 'message_id']
+    ordering = ['-created_at']
+    exclude = ['otp_code', 'claim_token']
+    readonly_fields = [
+        'phone_number', 'status', 'attempts', 'next_attempt_at', 'locked_at',
+        'message_id', 'error_type', 'last_error', 'expires_at', 'created_at', 'sent_at'
+    ]
+
+    def has_add_permission(self, request):
+        return False
+
+
+@admin.register(RevokedToken)
+class RevokedTokenAdmin(admin.ModelAdmin):
+    list_display = ['jti', 'revoked_at', 'expires_at']
+    search_fields = ['jti']
+    ordering = ['-revoked_at']
+    readonly_fields = ['jti', 'revoked_at', 'expires_at']
+
+    def has_add_permission(self, request):
+        return False
+
+
+@admin.register(TokenFamily)
+class TokenFamilyAdmin(admin.ModelAdmin):
+    list_display = ['user', 'created_at', 'rotated_at', 'expires_at', 'revoked_at']
+    list_filter = ['revoked_at', 'created_at']
+    search_fields = ['user__phone_number']
+    ordering = ['-created_at']
+    exclude = ['current_jti']
+    readonly_fields = ['user', 'created_at', 'rotated_at', 'expires_at', 'revoked_at']
+
+    def has_add_permission(self, request):
+        return False
@@ -3,3 +3,11 @@ from django.apps import AppConfig
 
 class AuthenticationConfig(AppConfig):
     name = 'authentication'
+
+    def ready(self):
+        import authentication.checks
+        import authentication.signals
+        from django.db.backends.signals import connection_created
+        from config.db import apply_sqlite_pragmas
+
+        connection_created.connect(apply_sqlite_pragmas, dispatch_uid='config.db.apply_sqlite_pragmas')
@@ -1,6 +1,8 @@
 import re
 from django.contrib.auth import get_user_model
 from django.contrib.auth.backends import ModelBackend
+from config import sharding
+from .directory import get_user_by_phone
 
 User = get_user_model()
 
@@ -15,9 +17,9 @@ class PhoneNumberBackend(ModelBackend):
         if not re.match(r'^09\d{9}$', phone_number):
             return None
 
-        try:
-            user = User.objects.get(phone_number=phone_number)
-        except User.DoesNotExist:
+        user = get_user_by_phone(phone_number)
+
+        if user is None:
             return None
 
         if user.check_password(password) and self.user_can_authenticate(user):
@@ -26,6 +28,8 @@ class PhoneNumberBackend(ModelBackend):
         return None
 
     def get_user(self, user_id):
+        sharding.activate(sharding.shard_for_key(user_id))
+
         try:
             return User.objects.get(pk=user_id)
         except User.DoesNotExist:
@@ -0,0 +1,186 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.db import router
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import aware_utcnow
+
+
+class LocalTTLCache:
+    def __init__(self, maxsize, ttl):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        now = time.monotonic()
+
+        with self._lock:
+            item = self._data.get(key)
+
+            if item is None or item[1] <= now:
+                if item is not None:
+                    del self._data[key]
+                self.misses += 1
+                return None
+
+            self._data.move_to_end(key)
+            self.hits += 1
+            return item[0]
+
+    def set(self, key, value, ttl=None):
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+
+        with self._lock:
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def get_stats(self):
+        with self._lock:
+            size = len(self._data)
+
+        lookups = self.hits + self.misses
+        return {
+            'size': size,
+            'maxsize': self.maxsize,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_ratio': round(self.hits / lookups, 3) if lookups else 0.0,
+        }
+
+
+class UserCache:
+    _local = None
+
+    @staticmethod
+    def local():
+        if UserCache._local is None:
+            UserCache._local = LocalTTLCache(
+                maxsize=settings.AUTH_USER_CACHE['LOCAL_MAXSIZE'],
+                ttl=settings.AUTH_USER_CACHE['LOCAL_TTL_SECONDS']
+            )
+        return UserCache._local
+
+    @staticmethod
+    def shared():
+        return caches[settings.AUTH_USER_CACHE['CACHE_ALIAS']]
+
+    @staticmethod
+    def key(user_id):
+        return f'auth:user:{user_id}'
+
+    @staticmethod
+    def _field_names():
+        return [field.attname for field in get_user_model()._meta.concrete_fields]
+
+    @staticmethod
+    def _build(values):
+        # Each request gets its own instance, so a view mutating request.user
+        # never leaks into the cached copy
+        User = get_user_model()
+        field_names = UserCache._field_names()
+        return User.from_db(
+            router.db_for_read(User),
+            field_names,
+            [values[name] for name in field_names]
+        )
+
+    @staticmethod
+    def get(user_id):
+        key = UserCache.key(user_id)
+        values = UserCache.local().get(key)
+
+        if values is None:
+            values = UserCache.shared().get(key)
+
+            if values is None:
+                # Cache fills read the primary; a lagging replica could hand back
+                # a user that was just deactivated and keep it cached
+                User = get_user_model()
+                values = (
+                    User.objects.db_manager(router.db_for_write(User))
+                    .filter(**{api_settings.USER_ID_FIELD: user_id})
+                    .values(*UserCache._field_names())
+                    .first()
+                )
+
+                if values is None:
+                    return None
+
+                UserCache.shared().set(key, values, timeout=settings.AUTH_USER_CACHE['SHARED_TTL_SECONDS'])
+
+            UserCache.local().set(key, values)
+
+        return UserCache._build(values)
+
+    @staticmethod
+    def invalidate(user_id):
+        key = UserCache.key(user_id)
+        UserCache.local().delete(key)
+        UserCache.shared().delete(key)
+
+
+class TokenCache:
+    # Only access tokens pass through here. They are self-contained and stay
+    # valid until exp even when their refresh token or family is revoked, so
+    # there is nothing to evict: caching the validation changes no outcome
+    _local = None
+
+    @staticmethod
+    def local():
+        if TokenCache._local is None:
+            # Entries always carry their own TTL (the token's exp), so the default is unused
+            TokenCache._local = LocalTTLCache(maxsize=settings.AUTH_TOKEN_CACHE['MAXSIZE'], ttl=0)
+        return TokenCache._local
+
+    @staticmethod
+    def key(raw_token):
+        raw_token = raw_token.encode() if isinstance(raw_token, str) else raw_token
+        return hashlib.sha256(raw_token).digest()
+
+    @staticmethod
+    def get(raw_token):
+        cached = TokenCache.local().get(TokenCache.key(raw_token))
+
+        if cached is None:
+            return None
+
+        # Rebuild the token wrapper around the already validated claims
+        # without decoding or verifying the signature again
+        token_class, payload = cached
+        token = token_class.__new__(token_class)
+        token.token = raw_token
+        token.current_time = aware_utcnow()
+        token.payload = dict(payload)
+        return token
+
+    @staticmethod
+    def set(raw_token, token):
+        ttl = token.payload.get('exp', 0) - time.time()
+
+        if ttl <= 0:
+            return
+
+        TokenCache.local().set(TokenCache.key(raw_token), (type(token), dict(token.payload)), ttl=ttl)
+
+    @staticmethod
+    def clear():
+        TokenCache.local().clear()
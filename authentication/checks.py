@@ -0,0 +1,40 @@
+from django.core.checks import Error, Warning, register
+from django.core.exceptions import ImproperlyConfigured
+from .jwt_keys import build_token_backend
+from .sms_provider import SMSProvider
+
+
+@register('sms')
+def check_sms_backends(app_configs, **kwargs):
+    try:
+        provider = SMSProvider.from_settings()
+    except (ImproperlyConfigured, ImportError) as e:
+        return [Error(str(e), id='authentication.E001')]
+
+    if not provider.backends:
+        return [Error('SMS_BACKENDS is empty.', id='authentication.E002')]
+
+    errors = provider.validate()
+    messages = [
+        Warning(
+            f"SMS backend '{backend.name}' is misconfigured: {error}",
+            hint='It is skipped in the failover chain.',
+            id='authentication.W001',
+        )
+        for backend, error in errors
+    ]
+
+    if len(errors) == len(provider.backends):
+        messages.append(Error('No SMS backend in SMS_BACKENDS is usable.', id='authentication.E003'))
+
+    return messages
+
+
+@register('security')
+def check_jwt_signing_keys(app_configs, **kwargs):
+    try:
+        build_token_backend()
+    except ImproperlyConfigured as e:
+        return [Error(str(e), id='authentication.E004')]
+
+    return []
@@ -0,0 +1,91 @@
+import time
+from django.core.cache import cache
+
+
+class CircuitBreaker:
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, name, failure_threshold, recovery_timeout):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+
+    def _key(self, suffix):
+        return f'circuit:{self.name}:{suffix}'
+
+    def _opened_at(self):
+        return cache.get(self._key('opened_at'))
+
+    def get_state(self):
+        opened_at = self._opened_at()
+
+        if opened_at is None:
+            return self.CLOSED
+
+        if time.time() - opened_at >= self.recovery_timeout:
+            return self.HALF_OPEN
+
+        return self.OPEN
+
+    def is_open(self):
+        return self.get_state() == self.OPEN
+
+    def allow_request(self):
+        state = self.get_state()
+
+        if state == self.CLOSED:
+            return True
+
+        if state == self.OPEN:
+            return False
+
+        # Only one caller across all processes probes the provider while half-open
+        return cache.add(self._key('probe'), 1, timeout=self.recovery_timeout)
+
+    def record_success(self):
+        cache.delete_many([
+            self._key('failures'),
+            self._key('opened_at'),
+            self._key('probe'),
+        ])
+
+    def record_failure(self):
+        if self.get_state() != self.CLOSED:
+            self._open()
+            return
+
+        failures_key = self._key('failures')
+        cache.add(failures_key, 0, timeout=self.recovery_timeout)
+
+        try:
+            failures = cache.incr(failures_key)
+        except ValueError:
+            cache.set(failures_key, 1, timeout=self.recovery_timeout)
+            failures = 1
+
+        if failures >= self.failure_threshold:
+            self._open()
+
+    def _open(self):
+        cache.set(self._key('opened_at'), time.time(), timeout=None)
+        cache.delete_many([self._key('failures'), self._key('probe')])
+
+    def retry_after(self):
+        opened_at = self._opened_at()
+
+        if opened_at is None:
+            return 0
+
+        return max(0, int(self.recovery_timeout - (time.time() - opened_at)))
+
+    def get_stats(self):
+        return {
+            'name': self.name,
+            'state': self.get_state(),
+            'failures': cache.get(self._key('failures'), 0),
+            'failure_threshold': self.failure_threshold,
+            'recovery_timeout': self.recovery_timeout,
+            'retry_after': self.retry_after(),
+        }
@@ -0,0 +1,62 @@
+from config import sharding
+from .models import User, UserDirectory
+
+
+def register(phone_number):
+    return UserDirectory.objects.create(phone_number=phone_number).pk
+
+
+def register_many(phone_numbers):
+    # Numbers that are already registered keep their ids
+    UserDirectory.objects.bulk_create(
+        [UserDirectory(phone_number=phone_number) for phone_number in phone_numbers],
+        ignore_conflicts=True
+    )
+    return dict(
+        UserDirectory.objects.filter(phone_number__in=phone_numbers).values_list('phone_number', 'pk')
+    )
+
+
+def unregister(user_id):
+    UserDirectory.objects.filter(pk=user_id).delete()
+
+
+def user_id_for_phone(phone_number):
+    return UserDirectory.objects.filter(phone_number=phone_number).values_list('pk', flat=True).first()
+
+
+def user_id_for_username(username):
+    return UserDirectory.objects.filter(username=username.lower()).values_list('pk', flat=True).first()
+
+
+def username_taken(username, user_id):
+    return UserDirectory.objects.filter(username=username.lower()).exclude(pk=user_id).exists()
+
+
+def claimed_username(user_id):
+    return UserDirectory.objects.filter(pk=user_id).values_list('username', flat=True).first()
+
+
+def claim_username(user_id, username):
+    # The unique column makes the directory the arbiter for usernames that
+    # would otherwise only be unique within one shard
+    return UserDirectory.objects.filter(pk=user_id).update(username=username.lower() if username else None)
+
+
+def existing_phone_numbers(phone_numbers):
+    if not sharding.is_enabled():
+        return set(User.objects.filter(phone_number__in=phone_numbers).values_list('phone_number', flat=True))
+
+    return set(UserDirectory.objects.filter(phone_number__in=phone_numbers).values_list('phone_number', flat=True))
+
+
+def get_user_by_phone(phone_number):
+    if not sharding.is_enabled():
+        return User.objects.filter(phone_number=phone_number).first()
+
+    user_id = user_id_for_phone(phone_number)
+
+    if user_id is None:
+        return None
+
+    return User.objects.using(sharding.shard_for_key(user_id)).filter(pk=user_id).first()
@@ -0,0 +1,200 @@
+import json
+import threading
+import jwt
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from django.utils.translation import gettext_lazy as _
+from jwt.algorithms import get_default_algorithms
+from rest_framework_simplejwt.backends import TokenBackend
+from rest_framework_simplejwt.exceptions import TokenBackendError, TokenBackendExpiredToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.state import token_backend as default_token_backend
+
+ASYMMETRIC_ALGORITHMS = ('EdDSA', 'RS256', 'ES256')
+
+
+class SigningKey:
+    def __init__(self, kid, private_key, public_key):
+        self.kid = kid
+        self.private_key = private_key
+        self.public_key = public_key
+
+    @classmethod
+    def from_pem(cls, kid, pem):
+        # cryptography is only needed once asymmetric signing is switched on
+        try:
+            from cryptography.hazmat.primitives.serialization import load_pem_private_key, load_pem_public_key
+        except ImportError:
+            raise ImproperlyConfigured('Asymmetric JWT signing requires the cryptography package')
+
+        pem = pem.encode() if isinstance(pem, str) else pem
+
+        try:
+            private_key = load_pem_private_key(pem, password=None)
+        except (TypeError, ValueError):
+            # Retired keys only need to verify, so a bare public key is accepted
+            private_key = None
+            try:
+                public_key = load_pem_public_key(pem)
+            except ValueError as e:
+                raise ImproperlyConfigured(f"JWT key '{kid}' is not a valid PEM key: {e}")
+        else:
+            public_key = private_key.public_key()
+
+        return cls(kid, private_key, public_key)
+
+    @classmethod
+    def from_file(cls, kid, path):
+        try:
+            with open(path, 'rb') as key_file:
+                return cls.from_pem(kid, key_file.read())
+        except OSError as e:
+            raise ImproperlyConfigured(f"JWT key '{kid}' could not be read from {path}: {e}")
+
+
+class KeyRingTokenBackend(TokenBackend):
+    def __init__(self, algorithm, keys, legacy_backend=None, legacy_until=None, **kwargs):
+        if algorithm not in ASYMMETRIC_ALGORITHMS:
+            raise ImproperlyConfigured(f'Unsupported JWT signing algorithm: {algorithm!r}')
+
+        if not keys:
+            raise ImproperlyConfigured("JWT_SIGNING['KEYS'] must contain at least the current key")
+
+        if keys[0].private_key is None:
+            raise ImproperlyConfigured(f"Current JWT key '{keys[0].kid}' has no private key")
+
+        super().__init__(algorithm, **kwargs)
+        # The first key signs new tokens; the rest only verify until their tokens expire
+        self.current_key = keys[0]
+        self.keys = {key.kid: key for key in keys}
+        self.legacy_backend = legacy_backend
+        self.legacy_until = legacy_until
+        self.jwks_json = json.dumps(self._build_jwks(), separators=(',', ':')).encode()
+
+    def _build_jwks(self):
+        algorithm = get_default_algorithms()[self.algorithm]
+        keys = []
+
+        for key in self.keys.values():
+            jwk = algorithm.to_jwk(key.public_key, as_dict=True)
+            jwk.update({'kid': key.kid, 'alg': self.algorithm, 'use': 'sig'})
+            keys.append(jwk)
+
+        return {'keys': keys}
+
+    def encode(self, payload):
+        jwt_payload = payload.copy()
+        if self.audience is not None:
+            jwt_payload['aud'] = self.audience
+        if self.issuer is not None:
+            jwt_payload['iss'] = self.issuer
+
+        return jwt.encode(
+            jwt_payload,
+            self.current_key.private_key,
+            algorithm=self.algorithm,
+            headers={'kid': self.current_key.kid},
+            json_encoder=self.json_encoder
+        )
+
+    def decode(self, token, verify=True):
+        try:
+            header = jwt.get_unverified_header(token)
+        except jwt.InvalidTokenError as e:
+            raise TokenBackendError(_("Token is invalid")) from e
+
+        key = self.keys.get(header.get('kid'))
+
+        if key is None:
+            # Tokens signed before the switch keep working until the cutoff
+            if (
+                self.legacy_backend is not None
+                and header.get('alg') == self.legacy_backend.algorithm
+                and timezone.now() < self.legacy_until
+            ):
+                return self.legacy_backend.decode(token, verify=verify)
+            raise TokenBackendError(_("Token is invalid"))
+
+        try:
+            return jwt.decode(
+                token,
+                key.public_key,
+                algorithms=[self.algorithm],
+                audience=self.audience,
+                issuer=self.issuer,
+                leeway=self.get_leeway(),
+                options={
+                    'verify_aud': self.audience is not None,
+                    'verify_signature': verify,
+                }
+            )
+        except jwt.InvalidAlgorithmError as e:
+            raise TokenBackendError(_("Invalid algorithm specified")) from e
+        except jwt.ExpiredSignatureError as e:
+            raise TokenBackendExpiredToken(_("Token is expired")) from e
+        except jwt.InvalidTokenError as e:
+            raise TokenBackendError(_("Token is invalid")) from e
+
+
+def parse_legacy_cutoff(value):
+    if not value:
+        return None
+
+    try:
+        cutoff = parse_datetime(value)
+    except ValueError:
+        cutoff = None
+
+    if cutoff is None or timezone.is_naive(cutoff):
+        raise ImproperlyConfigured(f'JWT_LEGACY_TOKENS_UNTIL must be an ISO 8601 datetime with a UTC offset: {value!r}')
+
+    # No legacy token can outlive the refresh lifetime, so neither may the cutoff
+    if cutoff > timezone.now() + api_settings.REFRESH_TOKEN_LIFETIME:
+        raise ImproperlyConfigured('JWT_LEGACY_TOKENS_UNTIL is further away than REFRESH_TOKEN_LIFETIME')
+
+    return cutoff
+
+
+def build_token_backend():
+    config = settings.JWT_SIGNING
+
+    if config['ALGORITHM'] == api_settings.ALGORITHM and not config['KEYS']:
+        return default_token_backend
+
+    keys = [SigningKey.from_file(kid, path) for kid, path in config['KEYS']]
+    legacy_until = parse_legacy_cutoff(config['LEGACY_TOKENS_UNTIL'])
+
+    return KeyRingTokenBackend(
+        config['ALGORITHM'],
+        keys,
+        legacy_backend=default_token_backend if legacy_until else None,
+        legacy_until=legacy_until,
+        audience=api_settings.AUDIENCE,
+        issuer=api_settings.ISSUER,
+        leeway=api_settings.LEEWAY,
+        json_encoder=api_settings.JSON_ENCODER
+    )
+
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def get_token_backend():
+    global _backend
+
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                _backend = build_token_backend()
+
+    return _backend
+
+
+def reset_token_backend():
+    global _backend
+
+    with _backend_lock:
+        _backend = None
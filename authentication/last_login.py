@@ -0,0 +1,151 @@
+import atexit
+import logging
+import os
+import threading
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import close_old_connections
+from django.db.models import Case, DateTimeField, Value, When
+from django.utils import timezone
+from django.utils.translation import gettext_lazy as _
+from config import sharding
+from .caching import LocalTTLCache
+
+logger = logging.getLogger('authentication')
+
+
+class LastLoginBuffer:
+    def __init__(self, flush_interval, min_interval, batch_size):
+        self.flush_interval = flush_interval
+        self.min_interval = min_interval
+        self.batch_size = batch_size
+        self.pending = {}
+        # Users written recently are skipped until min_interval has passed
+        self.recent = LocalTTLCache(maxsize=100000, ttl=min_interval)
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._closed = threading.Event()
+        self._thread = None
+        self._pid = None
+
+    def record(self, user_id, now=None):
+        if self.recent.get(user_id) is not None:
+            return False
+
+        now = now or timezone.now()
+
+        with self._lock:
+            self.pending[user_id] = now
+
+        self.recent.set(user_id, now)
+        self._ensure_worker()
+        return True
+
+    def _ensure_worker(self):
+        # Threads do not survive fork, so each worker process starts its own
+        if self._thread is not None and self._pid == os.getpid():
+            return
+
+        with self._lock:
+            if self._thread is not None and self._pid == os.getpid():
+                return
+
+            # Only a buffer that has started flushing has writes to save at
+            # exit; forked children inherit the registration
+            if self._thread is None:
+                atexit.register(self._flush_at_exit)
+
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, name='last-login-flush', daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while not self._closed.is_set():
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+
+            if self._closed.is_set():
+                break
+
+            try:
+                self.flush()
+            except Exception as e:
+                logger.exception(
+                    _("Last login flush failed"),
+                    extra={'error': str(e)}
+                )
+            finally:
+                close_old_connections()
+
+    def _flush_at_exit(self):
+        # Logging may already be torn down at interpreter exit
+        self.flush(log=False)
+
+    def close(self):
+        # Pending writes are dropped, not flushed
+        with self._lock:
+            self.pending = {}
+
+        self._closed.set()
+        self._wakeup.set()
+        atexit.unregister(self._flush_at_exit)
+
+    def flush(self, log=True):
+        with self._lock:
+            pending, self.pending = self.pending, {}
+
+        if not pending:
+            return 0
+
+        User = get_user_model()
+        items = list(pending.items())
+        updated = 0
+
+        for start in range(0, len(items), self.batch_size):
+            batch = items[start:start + self.batch_size]
+            for alias, shard_batch in sharding.group_by_shard(batch, key=lambda item: item[0]).items():
+                updated += User.objects.using(alias).filter(pk__in=[user_id for user_id, _when in shard_batch]).update(
+                    last_login=Case(
+                        *[When(pk=user_id, then=Value(when)) for user_id, when in shard_batch],
+                        output_field=DateTimeField()
+                    )
+                )
+
+        if log:
+            logger.info(
+                _("Last login timestamps flushed"),
+                extra={'users': len(items), 'updated': updated}
+            )
+        return updated
+
+
+_buffer = None
+_buffer_lock = threading.Lock()
+
+
+def get_last_login_buffer():
+    global _buffer
+
+    if _buffer is None:
+        with _buffer_lock:
+            if _buffer is None:
+                _buffer = LastLoginBuffer(
+                    flush_interval=settings.LAST_LOGIN_FLUSH_INTERVAL_SECONDS,
+                    min_interval=settings.LAST_LOGIN_MIN_INTERVAL_SECONDS,
+                    batch_size=settings.LAST_LOGIN_BATCH_SIZE
+                )
+
+    return _buffer
+
+
+def reset_last_login_buffer():
+    global _buffer
+
+    with _buffer_lock:
+        if _buffer is not None:
+            _buffer.close()
+        _buffer = None
+
+
+def record_last_login(user_id):
+    return get_last_login_buffer().record(user_id)
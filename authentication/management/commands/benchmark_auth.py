@@ -0,0 +1,106 @@
+import time
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIRequestFactory
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from authentication.authentication import CachedJWTAuthentication
+from authentication.caching import TokenCache, UserCache
+from authentication.tokens import AccessToken
+
+User = get_user_model()
+
+BENCHMARK_PHONE_NUMBER = '09000000000'
+
+
+def measure(authenticate, request, iterations):
+    with CaptureQueriesContext(connection) as queries:
+        started = time.perf_counter()
+        for _i in range(iterations):
+            authenticate(request)
+        elapsed = time.perf_counter() - started
+
+    return {
+        'us_per_op': round(elapsed / iterations * 1_000_000, 1),
+        'queries_per_op': round(len(queries) / iterations, 2),
+    }
+
+
+def user_lookup(request, iterations):
+    UserCache.local().clear()
+    UserCache.invalidate(request.user_id)
+
+    return {
+        'JWTAuthentication': measure(JWTAuthentication().authenticate, request, iterations),
+        'CachedJWTAuthentication': measure(CachedJWTAuthentication().authenticate, request, iterations),
+    }
+
+
+def token_validation(request, iterations):
+    TokenCache.clear()
+    baseline = JWTAuthentication()
+    cached = CachedJWTAuthentication()
+    raw_token = cached.get_raw_token(cached.get_header(request))
+
+    return {
+        'JWTAuthentication': measure(lambda _request: baseline.get_validated_token(raw_token), request, iterations),
+        'CachedJWTAuthentication': measure(lambda _request: cached.get_validated_token(raw_token), request, iterations),
+    }
+
+
+SCENARIOS = {
+    'user-lookup': user_lookup,
+    'token-validation': token_validation,
+}
+
+
+class Command(BaseCommand):
+    help = 'Measure per-request cost of JWT authentication'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--scenario',
+            nargs='+',
+            choices=list(SCENARIOS),
+            help='Limit the run to these scenarios',
+        )
+        parser.add_argument(
+            '--iterations',
+            type=int,
+            default=2000,
+            help='Authenticated requests per measurement',
+        )
+        parser.add_argument(
+            '--rate',
+            type=int,
+            default=200,
+            help='Requests per second used to project CPU time per worker',
+        )
+
+    def handle(self, *args, **options):
+        iterations = max(1, options['iterations'])
+
+        # Everything runs inside a transaction that is rolled back, so the
+        # benchmark user never outlives the run
+        with transaction.atomic():
+            user = User.objects.create_user(phone_number=BENCHMARK_PHONE_NUMBER)
+            token = AccessToken.for_user(user)
+
+            request = APIRequestFactory().get('/', HTTP_AUTHORIZATION=f'Bearer {token}')
+            request.user_id = user.id
+
+            for name, scenario in SCENARIOS.items():
+                if options['scenario'] and name not in options['scenario']:
+                    continue
+
+                for variant, stats in scenario(request, iterations).items():
+                    self.stdout.write(
+                        f"{name} [{variant}]: {stats['us_per_op']} us/op, "
+                        f"{stats['queries_per_op']} queries/op, "
+                        f"{round(stats['us_per_op'] * options['rate'] / 1000, 1)} ms CPU/s at {options['rate']} req/s"
+                    )
+
+            transaction.set_rollback(True)
+
+        UserCache.invalidate(user.id)
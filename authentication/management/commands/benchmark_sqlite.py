@@ -0,0 +1,107 @@
+import os
+import random
+import sqlite3
+import tempfile
+import threading
+import time
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from config.db import LOCK_ERROR_MESSAGES, sqlite_pragma_statements
+
+SCHEMA = 'CREATE TABLE otps (phone_number TEXT PRIMARY KEY, otp_code TEXT, created_at REAL)'
+
+
+def connect(path, tuned):
+    # isolation_level=None leaves transaction control to the explicit BEGIN below,
+    # which is how Django drives SQLite inside atomic()
+    conn = sqlite3.connect(path, timeout=5, isolation_level=None, check_same_thread=False)
+
+    if tuned:
+        for statement in sqlite_pragma_statements():
+            conn.execute(statement)
+    else:
+        conn.execute('PRAGMA journal_mode = DELETE')
+
+    return conn
+
+
+def issue_otp(conn, tuned, phone_number):
+    # Read-then-write, like the OTP slot claim: a deferred transaction has to
+    # upgrade its shared lock, which SQLite refuses without waiting
+    conn.execute('BEGIN IMMEDIATE' if tuned else 'BEGIN')
+    try:
+        conn.execute('SELECT created_at FROM otps WHERE phone_number = ?', [phone_number]).fetchone()
+        conn.execute(
+            'INSERT OR REPLACE INTO otps (phone_number, otp_code, created_at) VALUES (?, ?, ?)',
+            [phone_number, f'{random.randint(0, 9999):04d}', time.time()]
+        )
+        conn.execute('COMMIT')
+    except Exception:
+        if conn.in_transaction:
+            conn.execute('ROLLBACK')
+        raise
+
+
+def run_worker(path, tuned, operations, stats, lock):
+    conn = connect(path, tuned)
+    retries = settings.DB_WRITE_RETRIES if tuned else 0
+    done = errors = 0
+
+    for _i in range(operations):
+        phone_number = f'09{random.randint(0, 999):09d}'
+
+        for attempt in range(retries + 1):
+            try:
+                issue_otp(conn, tuned, phone_number)
+                done += 1
+                break
+            except sqlite3.OperationalError as e:
+                if not any(message in str(e) for message in LOCK_ERROR_MESSAGES):
+                    raise
+                if attempt == retries:
+                    errors += 1
+                else:
+                    time.sleep(settings.DB_WRITE_RETRY_BACKOFF_SECONDS * 2 ** attempt * random.uniform(0.5, 1.5))
+
+    conn.close()
+
+    with lock:
+        stats['done'] += done
+        stats['errors'] += errors
+
+
+class Command(BaseCommand):
+    help = 'Compare lock errors and throughput of concurrent SQLite writers with and without the tuned settings'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=8, help='Concurrent writer threads')
+        parser.add_argument('--operations', type=int, default=200, help='Write transactions per worker')
+
+    def handle(self, *args, **options):
+        for mode, tuned in (('default', False), ('tuned', True)):
+            with tempfile.TemporaryDirectory() as directory:
+                path = os.path.join(directory, 'benchmark.sqlite3')
+                setup = sqlite3.connect(path)
+                setup.execute(SCHEMA)
+                setup.close()
+
+                stats = {'done': 0, 'errors': 0}
+                lock = threading.Lock()
+                threads = [
+                    threading.Thread(target=run_worker, args=(path, tuned, options['operations'], stats, lock))
+                    for _i in range(max(1, options['workers']))
+                ]
+
+                started = time.perf_counter()
+                for thread in threads:
+                    thread.start()
+                for thread in threads:
+                    thread.join()
+                elapsed = time.perf_counter() - started
+
+            total = stats['done'] + stats['errors']
+            self.stdout.write(
+                f"{mode}: {stats['done']} committed, {stats['errors']} lock errors "
+                f"({round(stats['errors'] / total * 100, 2) if total else 0}%), "
+                f"{round(stats['done'] / elapsed, 1)} tx/s"
+            )
@@ -0,0 +1,42 @@
+import os
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ec, ed25519, rsa
+from django.core.management.base import BaseCommand, CommandError
+
+KEY_FACTORIES = {
+    'EdDSA': lambda: ed25519.Ed25519PrivateKey.generate(),
+    'RS256': lambda: rsa.generate_private_key(public_exponent=65537, key_size=2048),
+    'ES256': lambda: ec.generate_private_key(ec.SECP256R1()),
+}
+
+
+class Command(BaseCommand):
+    help = 'Generate a private key for JWT signing and print its JWT_KEYS entry'
+
+    def add_arguments(self, parser):
+        parser.add_argument('kid', help='Key identifier published in the token header and JWKS')
+        parser.add_argument('path', help='Where to write the PEM file')
+        parser.add_argument(
+            '--algorithm',
+            choices=list(KEY_FACTORIES),
+            default='EdDSA',
+            help='Signing algorithm the key is generated for',
+        )
+
+    def handle(self, *args, **options):
+        if os.path.exists(options['path']):
+            raise CommandError(f"{options['path']} already exists")
+
+        private_key = KEY_FACTORIES[options['algorithm']]()
+        pem = private_key.private_bytes(
+            encoding=serialization.Encoding.PEM,
+            format=serialization.PrivateFormat.PKCS8,
+            encryption_algorithm=serialization.NoEncryption()
+        )
+
+        # Created with owner-only permissions before any key material is written
+        descriptor = os.open(options['path'], os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+        with os.fdopen(descriptor, 'wb') as key_file:
+            key_file.write(pem)
+
+        self.stdout.write(f"{options['kid']}={options['path']}")
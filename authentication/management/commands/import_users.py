@@ -0,0 +1,176 @@
+import csv
+import json
+import sys
+import time
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework import serializers
+from authentication import directory
+from authentication.services import SignupService
+from authentication.validators import validate_phone_number
+from profiles.models import Interest, Profile
+
+
+def read_csv(stream, interest_separator):
+    reader = csv.DictReader(stream)
+
+    for row in reader:
+        interests = row.get('interests') or ''
+        row['interests'] = [slug.strip() for slug in interests.split(interest_separator) if slug.strip()]
+        yield reader.line_num, row
+
+
+def read_ndjson(stream, interest_separator):
+    for line_number, line in enumerate(stream, 1):
+        line = line.strip()
+
+        if not line:
+            continue
+
+        try:
+            row = json.loads(line)
+        except json.JSONDecodeError:
+            row = None
+
+        # Malformed lines come through as None so they are counted, not fatal
+        yield line_number, row if isinstance(row, dict) else None
+
+
+READERS = {
+    'csv': read_csv,
+    'ndjson': read_ndjson,
+}
+
+
+class Command(BaseCommand):
+    help = 'Import users and profiles from a CSV or NDJSON file in batches'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="Input file, or '-' for stdin")
+        parser.add_argument(
+            '--format',
+            choices=list(READERS),
+            help='Input format; guessed from the file extension when omitted',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Rows inserted per batch',
+        )
+        parser.add_argument(
+            '--interest-separator',
+            default='|',
+            help='Separator between interest slugs in the CSV interests column',
+        )
+
+    def handle(self, *args, **options):
+        input_format = options['format'] or ('ndjson' if options['path'].endswith(('.ndjson', '.jsonl')) else 'csv')
+        batch_size = max(1, options['batch_size'])
+        self.interest_ids = dict(Interest.objects.values_list('slug', 'id'))
+        self.stats = {'read': 0, 'created': 0, 'existing': 0, 'invalid': 0, 'interests': 0}
+        self.started = time.monotonic()
+
+        if options['path'] == '-':
+            stream = sys.stdin
+        else:
+            try:
+                stream = open(options['path'], newline='', encoding='utf-8-sig')
+            except OSError as e:
+                raise CommandError(str(e))
+
+        try:
+            batch = {}
+
+            for line_number, row in READERS[input_format](stream, options['interest_separator']):
+                self.stats['read'] += 1
+
+                if row is None:
+                    self.stats['invalid'] += 1
+                    self.stderr.write(f'line {line_number}: not a JSON object, skipped')
+                    continue
+
+                entry = self.parse_row(row)
+
+                if entry is None:
+                    self.stats['invalid'] += 1
+                    continue
+
+                # Later duplicates inside the file count as existing rows
+                if entry['phone_number'] in batch:
+                    self.stats['existing'] += 1
+                    continue
+
+                batch[entry['phone_number']] = entry
+
+                if len(batch) >= batch_size:
+                    self.import_batch(batch)
+                    batch = {}
+
+            if batch:
+                self.import_batch(batch)
+        finally:
+            if stream is not sys.stdin:
+                stream.close()
+
+        self.report(final=True)
+
+    def parse_row(self, row):
+        try:
+            phone_number = validate_phone_number(row.get('phone_number'))
+        except serializers.ValidationError:
+            return None
+
+        return {
+            'phone_number': phone_number,
+            'first_name': (row.get('first_name') or '').strip()[:150],
+            'last_name': (row.get('last_name') or '').strip()[:150],
+            'interests': [
+                self.interest_ids[slug]
+                for slug in row.get('interests') or []
+                if slug in self.interest_ids
+            ][:Profile.MAX_INTERESTS],
+        }
+
+    def import_batch(self, batch):
+        existing = directory.existing_phone_numbers(list(batch))
+        self.stats['existing'] += len(existing)
+
+        users = [
+            SignupService.build_user(entry['phone_number'], entry['first_name'], entry['last_name'])
+            for phone_number, entry in batch.items()
+            if phone_number not in existing
+        ]
+
+        if not users:
+            self.report()
+            return
+
+        Through = Profile.interests.through
+
+        def link_interests(alias, created):
+            # Runs inside the shard's transaction, next to the profiles it links
+            links = [
+                Through(profile_id=profile.pk, interest_id=interest_id)
+                for phone_number, profile in created.items()
+                for interest_id in batch[phone_number]['interests']
+            ]
+            Through.objects.using(alias).bulk_create(links, ignore_conflicts=True)
+            self.stats['interests'] += len(links)
+
+        profiles = SignupService.create_batch(users, on_created=link_interests)
+
+        self.stats['created'] += len(profiles)
+        # Rows that lost a race with a concurrent signup are existing users too
+        self.stats['existing'] += len(users) - len(profiles)
+        self.report()
+
+    def report(self, final=False):
+        elapsed = time.monotonic() - self.started
+        rate = round(self.stats['read'] / elapsed, 1) if elapsed > 0 else 0.0
+
+        self.stdout.write(
+            f"{'done' if final else 'progress'}: read {self.stats['read']}, "
+            f"created {self.stats['created']}, existing {self.stats['existing']}, "
+            f"invalid {self.stats['invalid']}, interest links {self.stats['interests']}, "
+            f"{round(elapsed, 1)}s ({rate} rows/s)"
+        )
@@ -0,0 +1,129 @@
+import uuid
+from django.conf import settings
+from django.core import checks
+from django.core.cache import caches
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+from django.db.migrations.executor import MigrationExecutor
+from authentication.jwt_keys import build_token_backend
+from authentication.sms_provider import SMSProvider
+
+INSECURE_SECRET_KEYS = ('django-insecure-build-key', 'secret-key')
+
+
+def check_settings():
+    problems = []
+
+    if settings.SECRET_KEY in INSECURE_SECRET_KEYS or len(settings.SECRET_KEY) < 50:
+        problems.append('SECRET_KEY is a placeholder or shorter than 50 characters')
+
+    if not settings.DEBUG and not settings.ALLOWED_HOSTS:
+        problems.append('ALLOWED_HOSTS is empty')
+
+    if problems:
+        raise ImproperlyConfigured('; '.join(problems))
+
+    return f"DEBUG={settings.DEBUG}, ALLOWED_HOSTS={','.join(settings.ALLOWED_HOSTS) or '-'}"
+
+
+def check_system():
+    messages = checks.run_checks(include_deployment_checks=not settings.DEBUG)
+    errors = [message for message in messages if message.is_serious()]
+
+    if errors:
+        raise ImproperlyConfigured('; '.join(f'{message.id}: {message.msg}' for message in errors))
+
+    return f'{len(messages)} warnings'
+
+
+def check_database():
+    # Shards carry the full schema, so each one must be migrated like default
+    for alias in [DEFAULT_DB_ALIAS, *settings.DATABASE_SHARDS]:
+        executor = MigrationExecutor(connections[alias])
+        plan = executor.migration_plan(executor.loader.graph.leaf_nodes())
+        if plan:
+            raise ImproperlyConfigured(f'{len(plan)} migrations are not applied on {alias}')
+
+    for alias in settings.DATABASE_REPLICAS:
+        connections[alias].ensure_connection()
+
+    connection = connections[DEFAULT_DB_ALIAS]
+    database = settings.DATABASES[DEFAULT_DB_ALIAS]
+    pool = database.get('OPTIONS', {}).get('pool')
+
+    return (
+        f"{connection.vendor}, CONN_MAX_AGE={database.get('CONN_MAX_AGE', 0)}, "
+        f"health checks={'on' if database.get('CONN_HEALTH_CHECKS') else 'off'}, "
+        f"pool={'on' if pool else 'off'}, replicas={len(settings.DATABASE_REPLICAS)}, "
+        f"shards={len(settings.DATABASE_SHARDS)}"
+    )
+
+
+def check_cache():
+    config = settings.CACHES['default']
+
+    if not settings.DEBUG and config['BACKEND'].endswith('LocMemCache'):
+        raise ImproperlyConfigured('the default cache is per-process; set REDIS_URL or use a shared backend')
+
+    cache = caches['default']
+    key = f'preflight:{uuid.uuid4().hex}'
+    try:
+        cache.set(key, 1, timeout=10)
+        found = cache.get(key)
+        cache.delete(key)
+    except DatabaseError as e:
+        raise ImproperlyConfigured(f'{e} (run createcachetable for the database cache)')
+
+    if found != 1:
+        raise ImproperlyConfigured('a value written to the default cache could not be read back')
+
+    return config['BACKEND'].rsplit('.', 1)[-1]
+
+
+def check_jwt():
+    backend = build_token_backend()
+    keys = getattr(backend, 'keys', None)
+    return f"{backend.algorithm}, {f'{len(keys)} keys' if keys else 'shared secret'}"
+
+
+def check_sms():
+    provider = SMSProvider.from_settings()
+    errors = provider.validate()
+
+    if len(errors) == len(provider.backends):
+        raise ImproperlyConfigured('no SMS backend is usable')
+
+    usable = [backend.name for backend in provider.without_backends([backend for backend, _error in errors]).backends]
+    return ', '.join(usable)
+
+
+PREFLIGHT_CHECKS = {
+    'settings': check_settings,
+    'system checks': check_system,
+    'database': check_database,
+    'cache': check_cache,
+    'jwt': check_jwt,
+    'sms': check_sms,
+}
+
+
+class Command(BaseCommand):
+    help = 'Validate configuration and connectivity before a deployment starts serving traffic'
+
+    requires_system_checks = []
+
+    def handle(self, *args, **options):
+        failed = []
+
+        for name, check in PREFLIGHT_CHECKS.items():
+            try:
+                detail = check()
+            except Exception as e:
+                failed.append(name)
+                self.stdout.write(self.style.ERROR(f'FAIL {name}: {e}'))
+            else:
+                self.stdout.write(self.style.SUCCESS(f'OK   {name}: {detail}'))
+
+        if failed:
+            raise CommandError(f"Preflight failed: {', '.join(failed)}")
@@ -0,0 +1,83 @@
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from django.utils.translation import gettext_lazy as _
+from authentication.services import SMSOutboxService
+from authentication.validators import mask_phone_number
+
+logger = logging.getLogger('authentication')
+
+
+class Command(BaseCommand):
+    help = 'Deliver pending OTP messages from the SMS outbox'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=settings.SMS_OUTBOX_WORKERS,
+            help='Number of delivery threads',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=settings.SMS_OUTBOX_BATCH_SIZE,
+            help='Maximum number of messages claimed per poll',
+        )
+        parser.add_argument(
+            '--poll-interval',
+            type=float,
+            default=settings.SMS_OUTBOX_POLL_INTERVAL_SECONDS,
+            help='Seconds to wait when the outbox is empty',
+        )
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Drain the currently due messages and exit',
+        )
+
+    def handle(self, *args, **options):
+        workers = max(1, options['workers'])
+        batch_size = max(1, options['batch_size'])
+        poll_interval = options['poll_interval']
+
+        self.stdout.write(f'SMS outbox worker started with {workers} threads')
+
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='sms-outbox') as executor:
+            try:
+                while True:
+                    close_old_connections()
+                    batch = SMSOutboxService.claim_batch(batch_size)
+
+                    if batch:
+                        results = list(executor.map(self._deliver, batch))
+                        sent = sum(1 for delivered in results if delivered)
+                        self.stdout.write(f'Processed {len(batch)} messages, {sent} sent')
+                        continue
+
+                    if options['once']:
+                        break
+
+                    time.sleep(poll_interval)
+
+            except KeyboardInterrupt:
+                self.stdout.write('SMS outbox worker stopped')
+
+    def _deliver(self, entry):
+        try:
+            return SMSOutboxService.deliver(entry)
+        except Exception as e:
+            logger.exception(
+                _("Unexpected error occurred during outbox delivery"),
+                extra={
+                    'phone_number': mask_phone_number(entry.phone_number),
+                    'outbox_id': entry.pk,
+                    'error': str(e)
+                }
+            )
+            return False
+        finally:
+            close_old_connections()
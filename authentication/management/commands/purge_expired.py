@@ -0,0 +1,53 @@
+import time
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from authentication.purge import PURGE_TARGETS, run_purge
+
+
+class Command(BaseCommand):
+    help = 'Delete expired OTPs, revoked token rows and finished SMS outbox entries in batches'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--only',
+            nargs='+',
+            choices=list(PURGE_TARGETS),
+            help='Limit the purge to these targets',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=settings.PURGE_BATCH_SIZE,
+            help='Rows deleted per statement',
+        )
+        parser.add_argument(
+            '--sleep',
+            type=float,
+            default=settings.PURGE_BATCH_SLEEP_SECONDS,
+            help='Seconds to pause between batches',
+        )
+        parser.add_argument(
+            '--interval',
+            type=int,
+            default=0,
+            help='Repeat the purge every N seconds instead of exiting',
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            report = run_purge(
+                targets=options['only'],
+                batch_size=max(1, options['batch_size']),
+                sleep_seconds=options['sleep']
+            )
+
+            for name, stats in report.items():
+                self.stdout.write(
+                    f"{name}: deleted {stats['deleted']} rows in {stats['batches']} batches, "
+                    f"{stats['seconds']}s ({stats['rows_per_second']} rows/s)"
+                )
+
+            if not options['interval']:
+                break
+
+            time.sleep(options['interval'])
@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS
+from config import sharding
+from authentication.models import User, UserDirectory
+from profiles.models import Interest, Profile
+
+
+class Command(BaseCommand):
+    help = 'Copy the interest catalog onto every shard and report how users are spread over them'
+
+    def handle(self, *args, **options):
+        if not sharding.is_enabled():
+            raise CommandError('Sharding is disabled; set DATABASE_SHARDS first')
+
+        catalog = list(Interest.objects.using(DEFAULT_DB_ALIAS).values('pk', 'name', 'slug', 'created_at'))
+
+        for alias in sharding.shard_aliases():
+            # post_save mirroring only covers rows written after sharding was enabled
+            for row in catalog:
+                Interest.objects.using(alias).update_or_create(
+                    pk=row['pk'],
+                    defaults={'name': row['name'], 'slug': row['slug'], 'created_at': row['created_at']}
+                )
+            Interest.objects.using(alias).exclude(pk__in=[row['pk'] for row in catalog]).delete()
+
+            self.stdout.write(
+                f"{alias}: {User.objects.using(alias).count()} users, "
+                f"{Profile.objects.using(alias).count()} profiles, {len(catalog)} interests"
+            )
+
+        self.stdout.write(f"directory: {UserDirectory.objects.count()} users")
@@ -0,0 +1,27 @@
+# Generated by Django 6.0.2 on 2026-10-16 12:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('authentication', '0003_otp_expires_at_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RevokedToken',
+            fields=[
+                ('jti', models.CharField(max_length=64, primary_key=True, serialize=False)),
+                ('expires_at', models.DateTimeField()),
+                ('revoked_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'Revoked token',
+                'verbose_name_plural': 'Revoked tokens',
+                'db_table': 'revoked_tokens',
+                'indexes': [models.Index(fields=['expires_at'], name='revoked_token_expires_idx'), models.Index(fields=['revoked_at'], name='revoked_token_revoked_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 6.0.2 on 2026-10-16 13:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('authentication', '0005_tokenfamily'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserDirectory',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('phone_number', models.CharField(max_length=11, unique=True)),
+                ('username', models.CharField(blank=True, max_length=32, null=True, unique=True)),
+            ],
+            options={
+                'verbose_name': 'User directory entry',
+                'verbose_name_plural': 'User directory',
+                'db_table': 'user_directory',
+            },
+        ),
+    ]
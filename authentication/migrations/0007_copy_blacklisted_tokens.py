@@ -0,0 +1,48 @@
+# Copies unexpired blacklisted refresh-token JTIs from token_blacklist into revoked_tokens
+
+from django.db import DEFAULT_DB_ALIAS, migrations
+from django.utils import timezone
+
+BATCH_SIZE = 1000
+
+
+def copy_blacklisted_tokens(apps, schema_editor):
+    # revoked_tokens lives on the default database only
+    alias = schema_editor.connection.alias
+    if alias != DEFAULT_DB_ALIAS:
+        return
+
+    BlacklistedToken = apps.get_model('token_blacklist', 'BlacklistedToken')
+    RevokedToken = apps.get_model('authentication', 'RevokedToken')
+
+    rows = (
+        BlacklistedToken.objects.using(alias)
+        .filter(token__expires_at__gt=timezone.now())
+        .values_list('token__jti', 'token__expires_at')
+        .iterator(chunk_size=BATCH_SIZE)
+    )
+
+    batch = []
+    for jti, expires_at in rows:
+        # revoked_at is set to now, so running processes pick the rows up on
+        # their next catch-up instead of waiting for a full rebuild
+        batch.append(RevokedToken(jti=jti, expires_at=expires_at))
+
+        if len(batch) >= BATCH_SIZE:
+            RevokedToken.objects.using(alias).bulk_create(batch, ignore_conflicts=True)
+            batch = []
+
+    if batch:
+        RevokedToken.objects.using(alias).bulk_create(batch, ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('authentication', '0006_userdirectory'),
+        ('token_blacklist', '0013_alter_blacklistedtoken_options_and_more'),
+    ]
+
+    operations = [
+        migrations.RunPython(copy_blacklisted_tokens, migrations.RunPython.noop),
+    ]
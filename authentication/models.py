@@ -1,9 +1,11 @@
 import secrets
 import string
+import uuid
 from django.utils.translation import gettext_lazy as _
 from django.contrib.auth.models import AbstractBaseUser, BaseUserManager, PermissionsMixin
 from django.db import models
 from django.utils import timezone
+from config import sharding
 from .validators import validate_phone_number
 
 
@@ -21,6 +23,11 @@ class CustomUserManager(BaseUserManager):
             **extra_fields
         )
 
+        # Sharded users take their id from the global directory; the router
+        # then places the row on the shard that id hashes to
+        if sharding.is_enabled() and user.pk is None:
+            user.pk = UserDirectory.objects.create(phone_number=phone_number).pk
+
         if password:
             user.set_password(password)
         else:
@@ -89,6 +96,9 @@ class OTP(models.Model):
         db_table = 'otps'
         verbose_name = _("OTP")
         verbose_name_plural = _("OTPs")
+        indexes = [
+            models.Index(fields=['expires_at'], name='otp_expires_at_idx'),
+        ]
 
     def __str__(self):
         return f"{self.phone_number} - {self.otp_code}"
@@ -120,3 +130,90 @@ class OTP(models.Model):
     @staticmethod
     def generate_otp():
         return str(secrets.randbelow(9000) + 1000)
+
+
+class SMSOutbox(models.Model):
+    class Status(models.TextChoices):
+        PENDING = 'pending', _("Pending")
+        SENDING = 'sending', _("Sending")
+        SENT = 'sent', _("Sent")
+        FAILED = 'failed', _("Failed")
+
+    phone_number = models.CharField(max_length=11)
+    otp_code = models.CharField(max_length=4)
+    status = models.CharField(max_length=10, choices=Status.choices, default=Status.PENDING)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    claim_token = models.UUIDField(null=True, blank=True)
+    locked_at = models.DateTimeField(null=True, blank=True)
+    message_id = models.CharField(max_length=64, blank=True)
+    error_type = models.CharField(max_length=32, blank=True)
+    last_error = models.TextField(blank=True)
+    expires_at = models.DateTimeField()
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        db_table = 'sms_outbox'
+        verbose_name = _("SMS outbox entry")
+        verbose_name_plural = _("SMS outbox")
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at'], name='sms_outbox_due_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.phone_number} - {self.status}"
+
+
+class RevokedToken(models.Model):
+    jti = models.CharField(max_length=64, primary_key=True)
+    expires_at = models.DateTimeField()
+    revoked_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = 'revoked_tokens'
+        verbose_name = _("Revoked token")
+        verbose_name_plural = _("Revoked tokens")
+        indexes = [
+            models.Index(fields=['expires_at'], name='revoked_token_expires_idx'),
+            models.Index(fields=['revoked_at'], name='revoked_token_revoked_idx'),
+        ]
+
+    def __str__(self):
+        return self.jti
+
+
+class TokenFamily(models.Model):
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='token_families')
+    current_jti = models.CharField(max_length=64)
+    created_at = models.DateTimeField(auto_now_add=True)
+    rotated_at = models.DateTimeField(null=True, blank=True)
+    expires_at = models.DateTimeField()
+    revoked_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        db_table = 'token_families'
+        verbose_name = _("Token family")
+        verbose_name_plural = _("Token families")
+        indexes = [
+            models.Index(fields=['expires_at'], name='token_family_expires_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id} - {self.id}"
+
+
+class UserDirectory(models.Model):
+    # Global index on default; with sharding enabled its ids are the user ids
+    # and config.sharding maps each of them to the shard holding the user
+    phone_number = models.CharField(max_length=11, unique=True)
+    username = models.CharField(max_length=32, unique=True, null=True, blank=True)
+
+    class Meta:
+        db_table = 'user_directory'
+        verbose_name = _("User directory entry")
+        verbose_name_plural = _("User directory")
+
+    def __str__(self):
+        return f"{self.pk} - {self.phone_number}"
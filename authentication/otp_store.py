@@ -0,0 +1,369 @@
+import hashlib
+import hmac
+import threading
+from datetime import datetime, timedelta, timezone as dt_timezone
+from django.conf import settings
+from django.core.cache import caches
+from django.db import IntegrityError, connections, router, transaction
+from django.utils import timezone
+from django.utils.module_loading import import_string
+from .models import OTP
+
+
+class BaseOTPStore:
+    uses_model = False
+
+    def __init__(self, **options):
+        self.options = options
+
+    @staticmethod
+    def rate_limit_seconds():
+        return settings.OTP_RATE_LIMIT_MINUTES * 60
+
+    def generate_code(self, phone_number, now):
+        return OTP.generate_otp()
+
+    def issue(self, phone_number, otp_code, expires_at):
+        raise NotImplementedError
+
+    def release(self, phone_number, otp_code):
+        raise NotImplementedError
+
+    def consume(self, phone_number, otp_code):
+        raise NotImplementedError
+
+    def get(self, phone_number):
+        raise NotImplementedError
+
+    def delete(self, phone_number):
+        raise NotImplementedError
+
+    def entries(self):
+        raise NotImplementedError
+
+
+class DatabaseOTPStore(BaseOTPStore):
+    uses_model = True
+
+    UPSERT_VENDORS = ('sqlite', 'postgresql')
+
+    @staticmethod
+    def _objects(phone_number):
+        # The router places each code on the shard its phone number hashes to
+        return OTP.objects.db_manager(router.db_for_write(OTP, instance=OTP(phone_number=phone_number)))
+
+    def issue(self, phone_number, otp_code, expires_at):
+        now = timezone.now()
+        cutoff = now - timedelta(seconds=self.rate_limit_seconds())
+
+        if self._claim(phone_number, otp_code, now, expires_at, cutoff):
+            return OTP(
+                phone_number=phone_number,
+                otp_code=otp_code,
+                created_at=now,
+                expires_at=expires_at
+            ), 0
+
+        existing = self.get(phone_number)
+        return None, max(1, existing.time_until_next_request()) if existing else 1
+
+    def _claim(self, phone_number, otp_code, now, expires_at, cutoff):
+        connection = connections[self._objects(phone_number).db]
+
+        if connection.vendor not in self.UPSERT_VENDORS:
+            return self._claim_portable(phone_number, otp_code, now, expires_at, cutoff)
+
+        # One statement both takes the rate-limit slot and stores the code:
+        # the row is inserted, or overwritten only once its window has passed
+        quote = connection.ops.quote_name
+        table = quote(OTP._meta.db_table)
+        sql = (
+            f'INSERT INTO {table} ({quote("phone_number")}, {quote("otp_code")}, '
+            f'{quote("created_at")}, {quote("expires_at")}) VALUES (%s, %s, %s, %s) '
+            f'ON CONFLICT ({quote("phone_number")}) DO UPDATE SET '
+            f'{quote("otp_code")} = excluded.{quote("otp_code")}, '
+            f'{quote("created_at")} = excluded.{quote("created_at")}, '
+            f'{quote("expires_at")} = excluded.{quote("expires_at")} '
+            f'WHERE {table}.{quote("created_at")} <= %s'
+        )
+        adapt = connection.ops.adapt_datetimefield_value
+
+        with connection.cursor() as cursor:
+            cursor.execute(sql, [phone_number, otp_code, adapt(now), adapt(expires_at), adapt(cutoff)])
+            return cursor.rowcount == 1
+
+    def _claim_portable(self, phone_number, otp_code, now, expires_at, cutoff):
+        objects = self._objects(phone_number)
+        claimed = objects.filter(phone_number=phone_number, created_at__lte=cutoff).update(
+            otp_code=otp_code,
+            created_at=now,
+            expires_at=expires_at
+        )
+
+        if claimed:
+            return True
+
+        try:
+            with transaction.atomic(using=objects.db):
+                objects.create(
+                    phone_number=phone_number,
+                    otp_code=otp_code,
+                    expires_at=expires_at
+                )
+            return True
+        except IntegrityError:
+            return False
+
+    def release(self, phone_number, otp_code):
+        self._objects(phone_number).filter(phone_number=phone_number, otp_code=otp_code).delete()
+
+    def consume(self, phone_number, otp_code):
+        deleted, _rows = self._objects(phone_number).filter(
+            phone_number=phone_number,
+            otp_code=otp_code,
+            expires_at__gt=timezone.now()
+        ).delete()
+        return deleted > 0
+
+    def get(self, phone_number):
+        return self._objects(phone_number).filter(phone_number=phone_number).first()
+
+    def delete(self, phone_number):
+        self._objects(phone_number).filter(phone_number=phone_number).delete()
+
+    def entries(self):
+        return OTP.objects.all()
+
+
+class CacheOTPStore(BaseOTPStore):
+    INDEX_KEY = 'otp:index'
+
+    def __init__(self, **options):
+        super().__init__(**options)
+        self.cache = caches[options.get('cache_alias', 'default')]
+        self.track_index = options.get('admin_index', True)
+
+    @staticmethod
+    def _code_key(phone_number):
+        return f'otp:code:{phone_number}'
+
+    @staticmethod
+    def _slot_key(phone_number):
+        return f'otp:slot:{phone_number}'
+
+    @staticmethod
+    def _to_timestamp(value):
+        return value.timestamp()
+
+    @staticmethod
+    def _from_timestamp(value):
+        return datetime.fromtimestamp(value, tz=dt_timezone.utc)
+
+    def _build_record(self, phone_number, payload):
+        return OTP(
+            phone_number=phone_number,
+            otp_code=payload['code'],
+            created_at=self._from_timestamp(payload['created_at']),
+            expires_at=self._from_timestamp(payload['expires_at'])
+        )
+
+    def issue(self, phone_number, otp_code, expires_at):
+        now = timezone.now()
+        rate_limit = self.rate_limit_seconds()
+
+        # add() is set-if-absent, so only one request per window claims the slot
+        if not self.cache.add(self._slot_key(phone_number), self._to_timestamp(now), timeout=rate_limit):
+            claimed_at = self.cache.get(self._slot_key(phone_number))
+            if claimed_at is None:
+                return None, 1
+            return None, max(1, int(rate_limit - (now.timestamp() - claimed_at)))
+
+        payload = {
+            'code': otp_code,
+            'created_at': self._to_timestamp(now),
+            'expires_at': self._to_timestamp(expires_at),
+        }
+        timeout = max(1, int((expires_at - now).total_seconds()))
+        self.cache.set(self._code_key(phone_number), payload, timeout=timeout)
+
+        if self.track_index:
+            self._update_index(phone_number, payload['expires_at'])
+
+        return self._build_record(phone_number, payload), 0
+
+    def release(self, phone_number, otp_code):
+        payload = self.cache.get(self._code_key(phone_number))
+
+        if payload and payload['code'] == otp_code:
+            self.cache.delete_many([self._code_key(phone_number), self._slot_key(phone_number)])
+
+    def consume(self, phone_number, otp_code):
+        key = self._code_key(phone_number)
+        payload = self.cache.get(key)
+
+        if not payload or payload['code'] != otp_code:
+            return False
+
+        if payload['expires_at'] <= timezone.now().timestamp():
+            return False
+
+        # delete() reports whether this caller removed the key, which makes
+        # the code single-use even when two verifications race
+        return bool(self.cache.delete(key))
+
+    def get(self, phone_number):
+        payload = self.cache.get(self._code_key(phone_number))
+
+        if not payload:
+            return None
+
+        return self._build_record(phone_number, payload)
+
+    def delete(self, phone_number):
+        self.cache.delete_many([self._code_key(phone_number), self._slot_key(phone_number)])
+
+    def _update_index(self, phone_number, expires_at):
+        # The index only feeds the admin listing; a lost update under
+        # concurrency just hides an entry until the next issue
+        now = timezone.now().timestamp()
+        index = self.cache.get(self.INDEX_KEY) or {}
+        index = {phone: expiry for phone, expiry in index.items() if expiry > now}
+        index[phone_number] = expires_at
+        self.cache.set(self.INDEX_KEY, index, timeout=settings.OTP_EXPIRY_MINUTES * 60)
+
+    def entries(self):
+        index = self.cache.get(self.INDEX_KEY) or {}
+        payloads = self.cache.get_many([self._code_key(phone) for phone in index])
+
+        records = [
+            self._build_record(key.rsplit(':', 1)[-1], payload)
+            for key, payload in payloads.items()
+        ]
+        return sorted(records, key=lambda record: record.created_at, reverse=True)
+
+
+class StatelessOTPStore(BaseOTPStore):
+    def __init__(self, **options):
+        super().__init__(**options)
+        self.cache = caches[options.get('cache_alias', 'default')]
+        self.secret = (options.get('secret') or settings.OTP_HMAC_SECRET).encode()
+        self.step = options.get('step_seconds') or settings.OTP_STATELESS_STEP_SECONDS
+
+    @staticmethod
+    def _slot_key(phone_number):
+        return f'otp:slot:{phone_number}'
+
+    @staticmethod
+    def _issued_key(phone_number):
+        return f'otp:issued:{phone_number}'
+
+    def _counter(self, now):
+        return int(now.timestamp() // self.step)
+
+    def code_for(self, phone_number, counter):
+        # HOTP-style dynamic truncation (RFC 4226) of HMAC-SHA256 over phone and time step
+        message = phone_number.encode() + b':' + counter.to_bytes(8, 'big')
+        digest = hmac.new(self.secret, message, hashlib.sha256).digest()
+        offset = digest[-1] & 0x0F
+        binary = int.from_bytes(digest[offset:offset + 4], 'big') & 0x7FFFFFFF
+        return str(binary % 10000).zfill(4)
+
+    def generate_code(self, phone_number, now):
+        return self.code_for(phone_number, self._counter(now))
+
+    def _issued_counter(self, phone_number, otp_code, now):
+        # The code was generated a moment before issue(); it may belong to the previous step
+        current = self._counter(now)
+
+        for counter in (current, current - 1):
+            if hmac.compare_digest(self.code_for(phone_number, counter), otp_code):
+                return counter
+
+        return current
+
+    def issue(self, phone_number, otp_code, expires_at):
+        now = timezone.now()
+        rate_limit = self.rate_limit_seconds()
+
+        if not self.cache.add(self._slot_key(phone_number), now.timestamp(), timeout=rate_limit):
+            claimed_at = self.cache.get(self._slot_key(phone_number))
+            if claimed_at is None:
+                return None, 1
+            return None, max(1, int(rate_limit - (now.timestamp() - claimed_at)))
+
+        # Only the step counter is kept; the code itself is recomputed on verification
+        issued = {
+            'counter': self._issued_counter(phone_number, otp_code, now),
+            'created_at': now.timestamp(),
+            'expires_at': expires_at.timestamp(),
+        }
+        timeout = max(1, int((expires_at - now).total_seconds()))
+        self.cache.set(self._issued_key(phone_number), issued, timeout=timeout)
+
+        return OTP(
+            phone_number=phone_number,
+            otp_code=otp_code,
+            created_at=now,
+            expires_at=expires_at
+        ), 0
+
+    def release(self, phone_number, otp_code):
+        self.cache.delete_many([self._issued_key(phone_number), self._slot_key(phone_number)])
+
+    def consume(self, phone_number, otp_code):
+        key = self._issued_key(phone_number)
+        issued = self.cache.get(key)
+
+        # Only a code that was actually issued, and is still within
+        # OTP_EXPIRY_MINUTES, can be verified
+        if not issued or issued['expires_at'] <= timezone.now().timestamp():
+            return False
+
+        if not hmac.compare_digest(self.code_for(phone_number, issued['counter']), otp_code):
+            return False
+
+        # delete() reports whether this caller removed the record, which makes
+        # the code single-use even when two verifications race
+        return bool(self.cache.delete(key))
+
+    def get(self, phone_number):
+        issued = self.cache.get(self._issued_key(phone_number))
+
+        if not issued:
+            return None
+
+        return OTP(
+            phone_number=phone_number,
+            otp_code=self.code_for(phone_number, issued['counter']),
+            created_at=datetime.fromtimestamp(issued['created_at'], tz=dt_timezone.utc),
+            expires_at=datetime.fromtimestamp(issued['expires_at'], tz=dt_timezone.utc)
+        )
+
+    def delete(self, phone_number):
+        self.cache.delete_many([self._issued_key(phone_number), self._slot_key(phone_number)])
+
+    def entries(self):
+        return []
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_otp_store():
+    global _store
+
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                store_class = import_string(settings.OTP_STORE['BACKEND'])
+                _store = store_class(**settings.OTP_STORE.get('OPTIONS', {}))
+
+    return _store
+
+
+def reset_otp_store():
+    global _store
+
+    with _store_lock:
+        _store = None
@@ -0,0 +1,113 @@
+import logging
+import time
+from datetime import timedelta
+from django.conf import settings
+from django.utils import timezone
+from django.utils.translation import gettext_lazy as _
+from config import sharding
+from .models import OTP, RevokedToken, SMSOutbox, TokenFamily
+
+logger = logging.getLogger('authentication')
+
+
+def expired_otps(now):
+    return OTP.objects.filter(expires_at__lt=now)
+
+
+def expired_revoked_tokens(now):
+    return RevokedToken.objects.filter(expires_at__lt=now)
+
+
+def expired_token_families(now):
+    return TokenFamily.objects.filter(expires_at__lt=now)
+
+
+def finished_sms_outbox(now):
+    return SMSOutbox.objects.filter(
+        status__in=[SMSOutbox.Status.SENT, SMSOutbox.Status.FAILED],
+        created_at__lt=now - timedelta(days=settings.SMS_OUTBOX_RETENTION_DAYS)
+    )
+
+
+PURGE_TARGETS = {
+    'otps': expired_otps,
+    'revoked_tokens': expired_revoked_tokens,
+    'token_families': expired_token_families,
+    'sms_outbox': finished_sms_outbox,
+}
+
+
+def purge_in_batches(queryset, batch_size, sleep_seconds):
+    deleted_total = 0
+    batches = 0
+    last_pk = None
+    started = time.monotonic()
+
+    while True:
+        window = queryset.order_by('pk')
+        if last_pk is not None:
+            window = window.filter(pk__gt=last_pk)
+
+        pks = list(window.values_list('pk', flat=True)[:batch_size])
+        if not pks:
+            break
+
+        # Delete by primary-key range so each statement touches a bounded slice
+        deleted, _rows = queryset.filter(pk__gte=pks[0], pk__lte=pks[-1]).delete()
+        deleted_total += deleted
+        batches += 1
+        last_pk = pks[-1]
+
+        if len(pks) < batch_size:
+            break
+
+        if sleep_seconds:
+            time.sleep(sleep_seconds)
+
+    elapsed = time.monotonic() - started
+
+    return {
+        'deleted': deleted_total,
+        'batches': batches,
+        'seconds': round(elapsed, 3),
+        'rows_per_second': round(deleted_total / elapsed, 1) if elapsed > 0 else 0.0,
+    }
+
+
+def combine_results(results):
+    if len(results) == 1:
+        return results[0]
+
+    deleted = sum(result['deleted'] for result in results)
+    seconds = round(sum(result['seconds'] for result in results), 3)
+
+    return {
+        'deleted': deleted,
+        'batches': sum(result['batches'] for result in results),
+        'seconds': seconds,
+        'rows_per_second': round(deleted / seconds, 1) if seconds > 0 else 0.0,
+    }
+
+
+def run_purge(targets=None, batch_size=None, sleep_seconds=None):
+    batch_size = batch_size or settings.PURGE_BATCH_SIZE
+    sleep_seconds = settings.PURGE_BATCH_SLEEP_SECONDS if sleep_seconds is None else sleep_seconds
+    now = timezone.now()
+    report = {}
+
+    for name, build_queryset in PURGE_TARGETS.items():
+        if targets and name not in targets:
+            continue
+
+        results = [
+            purge_in_batches(queryset, batch_size, sleep_seconds)
+            for queryset in sharding.querysets_for(build_queryset(now))
+        ]
+        report[name] = combine_results(results)
+
+        logger.info(
+            _("Expired rows purged"),
+            extra={'target': name, **report[name]}
+        )
+
+    return report
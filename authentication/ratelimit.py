@@ -0,0 +1,140 @@
+import ipaddress
+import math
+import re
+import time
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework.throttling import BaseThrottle
+
+
+RATE_PATTERN = re.compile(r'^(?P<limit>\d+)/(?P<count>\d*)(?P<unit>[smhd])$')
+UNIT_SECONDS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+
+
+def parse_rate(rate):
+    match = RATE_PATTERN.match(rate.strip())
+
+    if not match:
+        raise ValueError(f'Invalid rate: {rate!r}')
+
+    count = int(match.group('count') or 1)
+    return int(match.group('limit')), count * UNIT_SECONDS[match.group('unit')]
+
+
+class SlidingWindowRateLimiter:
+    def __init__(self, rate, cache_alias='default'):
+        self.limit, self.window = parse_rate(rate)
+        self.cache = caches[cache_alias]
+
+    def hit(self, key, now=None):
+        now = time.time() if now is None else now
+        bucket = int(now // self.window)
+        elapsed = now - bucket * self.window
+        current_key = f'{key}:{bucket}'
+        previous_key = f'{key}:{bucket - 1}'
+
+        # Counters live for two windows so the previous bucket is still
+        # readable while the current one fills up
+        self.cache.add(current_key, 0, timeout=self.window * 2)
+        try:
+            current = self.cache.incr(current_key)
+        except ValueError:
+            self.cache.set(current_key, 1, timeout=self.window * 2)
+            current = 1
+
+        previous = self.cache.get(previous_key, 0)
+        weight = 1 - elapsed / self.window
+        estimated = previous * weight + current
+
+        if estimated <= self.limit:
+            return True, 0
+
+        if current > self.limit or previous == 0:
+            return False, max(1, math.ceil(self.window - elapsed))
+
+        # Time until the previous bucket's share decays enough to admit a request
+        needed_weight = (self.limit - current) / previous
+        return False, max(1, math.ceil((weight - needed_weight) * self.window))
+
+
+_limiters = {}
+
+
+def get_limiter(rate):
+    limiter = _limiters.get(rate)
+
+    if limiter is None:
+        limiter = SlidingWindowRateLimiter(rate, settings.OTP_RATE_LIMIT_CACHE_ALIAS)
+        _limiters[rate] = limiter
+
+    return limiter
+
+
+class MultiKeyRateThrottle(BaseThrottle):
+    scope = None
+
+    def __init__(self):
+        self.retry_after = None
+
+    def get_subnet(self, request):
+        ident = self.get_ident(request)
+
+        try:
+            address = ipaddress.ip_address(ident)
+        except ValueError:
+            return None
+
+        prefix = 24 if address.version == 4 else 64
+        return str(ipaddress.ip_network(f'{address}/{prefix}', strict=False))
+
+    def get_phone_number(self, request):
+        try:
+            phone_number = request.data.get('phone_number')
+        except AttributeError:
+            return None
+
+        if not isinstance(phone_number, str) or not phone_number.strip():
+            return None
+
+        return phone_number.strip()
+
+    def get_key_value(self, dimension, request):
+        if dimension == 'phone':
+            return self.get_phone_number(request)
+        if dimension == 'ip':
+            return self.get_ident(request)
+        if dimension == 'subnet':
+            return self.get_subnet(request)
+        if dimension == 'global':
+            return 'all'
+        raise ValueError(f'Unknown rate limit dimension: {dimension!r}')
+
+    def allow_request(self, request, view):
+        limits = settings.OTP_RATE_LIMITS.get(self.scope, {})
+
+        # The global budget is shared by every client, so it only counts
+        # requests that every per-client limit has already let through
+        for dimension, rate in sorted(limits.items(), key=lambda item: item[0] == 'global'):
+            value = self.get_key_value(dimension, request)
+
+            if value is None:
+                continue
+
+            allowed, retry_after = get_limiter(rate).hit(f'rl:{self.scope}:{dimension}:{value}')
+
+            if not allowed:
+                self.retry_after = retry_after
+                return False
+
+        return True
+
+    def wait(self):
+        return self.retry_after
+
+
+class RequestOTPRateThrottle(MultiKeyRateThrottle):
+    scope = 'request_otp'
+
+
+class VerifyOTPRateThrottle(MultiKeyRateThrottle):
+    scope = 'verify_otp'
@@ -0,0 +1,200 @@
+import hashlib
+import math
+import threading
+import time
+from datetime import datetime, timedelta, timezone as dt_timezone
+from django.conf import settings
+from django.core.cache import caches
+from django.utils import timezone
+from .models import RevokedToken
+
+
+class BloomFilter:
+    def __init__(self, capacity, false_positive_rate):
+        capacity = max(1, capacity)
+        self.size = max(8, int(-capacity * math.log(false_positive_rate) / math.log(2) ** 2))
+        self.hash_count = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, value):
+        # Double hashing: two 64-bit halves of one digest give every probe position
+        digest = hashlib.blake2b(value.encode(), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], 'big')
+        second = int.from_bytes(digest[8:], 'big') | 1
+        return ((first + i * second) % self.size for i in range(self.hash_count))
+
+    def add(self, value):
+        for position in self._positions(value):
+            self.bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, value):
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(value))
+
+
+class RevocationStore:
+    VERSION_KEY = 'revoked:version'
+
+    def __init__(self, cache_alias, refresh_seconds, rebuild_seconds, false_positive_rate, min_capacity):
+        self.cache = caches[cache_alias]
+        self.refresh_seconds = refresh_seconds
+        self.rebuild_seconds = rebuild_seconds
+        self.false_positive_rate = false_positive_rate
+        self.min_capacity = min_capacity
+        self.bloom = None
+        self.capacity = 0
+        self.count = 0
+        self.version = None
+        self.synced_at = None
+        self.checked_at = 0
+        self.rebuilt_at = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(jti):
+        return f'revoked:{jti}'
+
+    def revoke(self, jti, exp):
+        ttl = int(exp - time.time())
+
+        if ttl <= 0:
+            return True
+
+        # add() is set-if-absent, so exactly one caller revokes a given token;
+        # a concurrent rotation of the same refresh token loses here
+        if not self.cache.add(self.key(jti), 1, timeout=ttl):
+            return False
+
+        expires_at = datetime.fromtimestamp(exp, tz=dt_timezone.utc)
+        RevokedToken.objects.bulk_create(
+            [RevokedToken(jti=jti, expires_at=expires_at)],
+            ignore_conflicts=True
+        )
+
+        with self._lock:
+            if self.bloom is not None:
+                self.bloom.add(jti)
+                self.count += 1
+
+        self._bump_version()
+        return True
+
+    def is_revoked(self, jti):
+        self._sync()
+
+        if jti not in self.bloom:
+            return False
+
+        if self.cache.get(self.key(jti)) is not None:
+            return True
+
+        # The cache lost the entry (eviction or restart); the table is authoritative
+        revoked = RevokedToken.objects.filter(jti=jti, expires_at__gt=timezone.now()).values_list('expires_at', flat=True).first()
+
+        if revoked is None:
+            return False
+
+        ttl = int((revoked - timezone.now()).total_seconds())
+        if ttl > 0:
+            self.cache.add(self.key(jti), 1, timeout=ttl)
+        return True
+
+    def _bump_version(self):
+        try:
+            self.cache.incr(self.VERSION_KEY)
+        except ValueError:
+            self.cache.add(self.VERSION_KEY, 1, timeout=None)
+
+    def _sync(self):
+        now = time.monotonic()
+
+        if self.bloom is not None and now - self.checked_at < self.refresh_seconds:
+            return
+
+        with self._lock:
+            if self.bloom is not None and now - self.checked_at < self.refresh_seconds:
+                return
+
+            self.checked_at = now
+            version = self.cache.get(self.VERSION_KEY)
+
+            if (
+                self.bloom is None
+                or now - self.rebuilt_at >= self.rebuild_seconds
+                or self.count > self.capacity
+            ):
+                self._rebuild(version, now)
+            elif version != self.version:
+                self._catch_up(version)
+
+    def _rebuild(self, version, now):
+        synced_at = timezone.now()
+        jtis = list(
+            RevokedToken.objects
+            .filter(expires_at__gt=synced_at)
+            .values_list('jti', flat=True)
+            .iterator()
+        )
+
+        # Sized with headroom so revocations until the next rebuild keep the
+        # false-positive rate near the target
+        capacity = max(self.min_capacity, len(jtis) * 2)
+        bloom = BloomFilter(capacity, self.false_positive_rate)
+        for jti in jtis:
+            bloom.add(jti)
+
+        self.bloom = bloom
+        self.capacity = capacity
+        self.count = len(jtis)
+        self.version = version
+        self.synced_at = synced_at
+        self.rebuilt_at = now
+
+    def _catch_up(self, version):
+        synced_at = timezone.now()
+        # A small overlap covers rows committed while the previous sync ran
+        since = self.synced_at - timedelta(seconds=self.refresh_seconds)
+
+        for jti in RevokedToken.objects.filter(revoked_at__gte=since).values_list('jti', flat=True).iterator():
+            self.bloom.add(jti)
+            self.count += 1
+
+        self.version = version
+        self.synced_at = synced_at
+
+    def get_stats(self):
+        return {
+            'entries': self.count,
+            'capacity': self.capacity,
+            'bits': self.bloom.size if self.bloom else 0,
+            'hash_count': self.bloom.hash_count if self.bloom else 0,
+            'version': self.version,
+        }
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_revocation_store():
+    global _store
+
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                config = settings.TOKEN_REVOCATION
+                _store = RevocationStore(
+                    cache_alias=config['CACHE_ALIAS'],
+                    refresh_seconds=config['BLOOM_REFRESH_SECONDS'],
+                    rebuild_seconds=config['BLOOM_REBUILD_SECONDS'],
+                    false_positive_rate=config['BLOOM_FALSE_POSITIVE_RATE'],
+                    min_capacity=config['BLOOM_MIN_CAPACITY']
+                )
+
+    return _store
+
+
+def reset_revocation_store():
+    global _store
+
+    with _store_lock:
+        _store = None
@@ -1,13 +1,28 @@
 import logging
+import secrets
+import uuid
 from datetime import timedelta
 from django.conf import settings
+from django.contrib.auth.hashers import UNUSABLE_PASSWORD_PREFIX
+from django.db import IntegrityError, transaction
+from django.db.models import Q
 from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 from rest_framework_simplejwt.tokens import Token
 from rest_framework_simplejwt.exceptions import TokenError
-from .models import OTP
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import datetime_from_epoch
+from . import directory
+from .last_login import record_last_login
+from config.db import run_in_write_transaction
+from config import sharding
+from config.routers import pin_to_primary
+from profiles.models import Profile
+from .models import SMSOutbox, TokenFamily, User
+from .tokens import FAMILY_CLAIM, RefreshToken
 from .validators import validate_phone_number, mask_phone_number
-from .sms_provider import SMSProvider
+from .sms_provider import get_sms_provider
+from .otp_store import get_otp_store
 
 logger = logging.getLogger('authentication')
 
@@ -24,29 +39,43 @@ class OTPService:
                 'error_type': 'validation_error'
             }
 
-        try:
-            otp_record = OTP.objects.get(phone_number=phone_number)
+        sms_provider = get_sms_provider()
 
-            if not otp_record.can_request_new_otp():
-                seconds_remaining = otp_record.time_until_next_request()
-                return {
-                    'success': False,
-                    'error': _("Too many OTP requests. Please try again later"),
-                    'error_type': 'rate_limit_error',
-                    'retry_after': seconds_remaining
-                }
+        if not sms_provider.is_available():
+            return {
+                'success': False,
+                'error': _("Failed to send OTP. Please try again later"),
+                'error_type': 'connection_error',
+                'retry_after': sms_provider.retry_after()
+            }
+
+        otp_store = get_otp_store()
+        now = timezone.now()
+        otp_code = otp_store.generate_code(phone_number, now)
+        expires_at = now + timedelta(minutes=settings.OTP_EXPIRY_MINUTES)
 
-            otp_record.delete()
+        otp_record, retry_after = run_in_write_transaction(
+            OTPService._issue, otp_store, phone_number, otp_code, expires_at
+        )
 
-        except OTP.DoesNotExist:
-            pass
+        if otp_record is None:
+            return {
+                'success': False,
+                'error': _("Too many OTP requests. Please try again later"),
+                'error_type': 'rate_limit_error',
+                'retry_after': retry_after
+            }
 
-        otp_code = OTP.generate_otp()
-        expires_at = timezone.now() + timedelta(minutes=settings.OTP_EXPIRY_MINUTES)
+        if settings.SMS_DELIVERY_MODE == 'outbox':
+            return {
+                'success': True,
+                'otp': otp_record
+            }
 
-        sms_result = SMSProvider.send_otp(phone_number, otp_code)
+        sms_result = sms_provider.send_otp(phone_number, otp_code)
 
         if not sms_result['success']:
+            otp_store.release(phone_number, otp_code)
             logger.error(
                 _("OTP send failed"),
                 extra={
@@ -61,17 +90,27 @@ class OTPService:
                 'error_type': sms_result.get('error_type', 'provider_error')
             }
 
-        otp_record = OTP.objects.create(
-            phone_number=phone_number,
-            otp_code=otp_code,
-            expires_at=expires_at
-        )
-
         return {
             'success': True,
             'otp': otp_record
         }
 
+    @staticmethod
+    def _issue(otp_store, phone_number, otp_code, expires_at):
+        otp_record, retry_after = otp_store.issue(phone_number, otp_code, expires_at)
+
+        if otp_record is not None and settings.SMS_DELIVERY_MODE == 'outbox':
+            try:
+                SMSOutboxService.enqueue(phone_number, otp_code, expires_at)
+            except Exception:
+                # Cache-backed stores claim the slot outside the transaction, so a
+                # rollback would keep it and a retry would be rate limited
+                if not otp_store.uses_model:
+                    otp_store.release(phone_number, otp_code)
+                raise
+
+        return otp_record, retry_after
+
     @staticmethod
     def verify_otp(phone_number, otp_code):
         try:
@@ -82,18 +121,135 @@ class OTPService:
         if not otp_code.isdigit() or len(otp_code) != 4:
             return False
 
-        try:
-            otp_record = OTP.objects.get(phone_number=phone_number)
+        return get_otp_store().consume(phone_number, otp_code)
+
+
+class SMSOutboxService:
+    @staticmethod
+    def enqueue(phone_number, otp_code, expires_at):
+        return SMSOutbox.objects.create(
+            phone_number=phone_number,
+            otp_code=otp_code,
+            expires_at=expires_at
+        )
+
+    @staticmethod
+    def _due_filter(now):
+        stale_before = now - timedelta(seconds=settings.SMS_OUTBOX_LOCK_TIMEOUT_SECONDS)
+        return (
+            Q(status=SMSOutbox.Status.PENDING, next_attempt_at__lte=now)
+            | Q(status=SMSOutbox.Status.SENDING, locked_at__lt=stale_before)
+        )
+
+    @staticmethod
+    def claim_batch(limit):
+        now = timezone.now()
+        due_filter = SMSOutboxService._due_filter(now)
+
+        candidate_ids = list(
+            SMSOutbox.objects.filter(due_filter)
+            .order_by('next_attempt_at')
+            .values_list('pk', flat=True)[:limit]
+        )
+
+        if not candidate_ids:
+            return []
+
+        claim_token = uuid.uuid4()
+        SMSOutbox.objects.filter(due_filter, pk__in=candidate_ids).update(
+            status=SMSOutbox.Status.SENDING,
+            claim_token=claim_token,
+            locked_at=now
+        )
 
-            if otp_record.otp_code == otp_code and otp_record.is_valid():
-                otp_record.delete()
-                return True
+        return list(SMSOutbox.objects.filter(claim_token=claim_token))
 
+    @staticmethod
+    def deliver(entry):
+        now = timezone.now()
+        claimed = SMSOutbox.objects.filter(
+            pk=entry.pk,
+            claim_token=entry.claim_token,
+            status=SMSOutbox.Status.SENDING
+        )
+
+        if entry.expires_at <= now:
+            claimed.update(
+                status=SMSOutbox.Status.FAILED,
+                error_type='expired',
+                last_error=str(_("OTP expired before it could be delivered")),
+                locked_at=None
+            )
             return False
 
-        except OTP.DoesNotExist:
+        sms_provider = get_sms_provider()
+
+        if not sms_provider.is_available():
+            claimed.update(
+                status=SMSOutbox.Status.PENDING,
+                next_attempt_at=now + timedelta(seconds=max(1, sms_provider.retry_after())),
+                locked_at=None
+            )
             return False
 
+        sms_result = sms_provider.send_otp(entry.phone_number, entry.otp_code)
+        attempts = entry.attempts + 1
+
+        if sms_result['success']:
+            claimed.update(
+                status=SMSOutbox.Status.SENT,
+                attempts=attempts,
+                message_id=str(sms_result.get('message_id') or ''),
+                error_type='',
+                last_error='',
+                sent_at=timezone.now(),
+                locked_at=None
+            )
+            return True
+
+        error_type = sms_result.get('error_type', 'provider_error')
+        internal_error = str(sms_result.get('internal_error', 'Unknown error'))
+
+        if attempts >= settings.SMS_OUTBOX_MAX_ATTEMPTS:
+            logger.error(
+                _("OTP delivery failed permanently"),
+                extra={
+                    'phone_number': mask_phone_number(entry.phone_number),
+                    'attempts': attempts,
+                    'error_type': error_type,
+                    'internal_error': internal_error
+                }
+            )
+            claimed.update(
+                status=SMSOutbox.Status.FAILED,
+                attempts=attempts,
+                error_type=error_type,
+                last_error=internal_error,
+                locked_at=None
+            )
+            return False
+
+        retry_delay = settings.SMS_OUTBOX_RETRY_BASE_SECONDS * (2 ** (attempts - 1))
+
+        logger.warning(
+            _("OTP delivery failed, retry scheduled"),
+            extra={
+                'phone_number': mask_phone_number(entry.phone_number),
+                'attempts': attempts,
+                'retry_in': retry_delay,
+                'error_type': error_type
+            }
+        )
+        claimed.update(
+            status=SMSOutbox.Status.PENDING,
+            attempts=attempts,
+            error_type=error_type,
+            last_error=internal_error,
+            next_attempt_at=timezone.now() + timedelta(seconds=retry_delay),
+            locked_at=None
+        )
+        return False
+
 
 class SignupToken(Token):
     token_type = 'signup'
@@ -144,4 +300,221 @@ class SignupTokenService:
                     'error': str(e)
                 }
             )
-            return None
\ No newline at end of file
+            return None
+
+
+class TokenService:
+    @staticmethod
+    def issue_for_user(user):
+        refresh = RefreshToken.for_user(user)
+
+        # One family row per login; rotation rewrites it in place
+        with sharding.use_shard(sharding.shard_for_key(user.pk)):
+            family = TokenFamily.objects.create(
+                user=user,
+                current_jti=refresh[api_settings.JTI_CLAIM],
+                expires_at=datetime_from_epoch(refresh['exp'])
+            )
+        refresh[FAMILY_CLAIM] = str(family.id)
+
+        record_last_login(user.id)
+        # Login and signup run unauthenticated, so the middleware cannot pin them
+        pin_to_primary(user.id)
+        return refresh
+
+    @staticmethod
+    def rotate(raw_token):
+        try:
+            refresh = RefreshToken(raw_token)
+        except TokenError:
+            return {
+                'success': False,
+                'error': _("Invalid or Expired authentication token"),
+                'error_type': 'invalid_token'
+            }
+
+        # Families live on the shard of the user the token was issued to
+        with sharding.use_shard(sharding.shard_for_key(refresh[api_settings.USER_ID_CLAIM])):
+            return TokenService._rotate(refresh)
+
+    @staticmethod
+    def _rotate(refresh):
+        family_id = refresh.get(FAMILY_CLAIM)
+        user_id = refresh[api_settings.USER_ID_CLAIM]
+        old_jti = refresh[api_settings.JTI_CLAIM]
+
+        if family_id is None:
+            # Tokens issued before families existed are revoked individually
+            # and moved into a new family on this rotation
+            if not refresh.revoke():
+                return {
+                    'success': False,
+                    'error': _("Invalid or Expired authentication token"),
+                    'error_type': 'token_reused'
+                }
+
+            refresh.set_jti()
+            refresh.set_exp()
+            family = TokenFamily.objects.create(
+                user_id=user_id,
+                current_jti=refresh[api_settings.JTI_CLAIM],
+                expires_at=datetime_from_epoch(refresh['exp'])
+            )
+            refresh[FAMILY_CLAIM] = str(family.id)
+
+            record_last_login(user_id)
+            return {'success': True, 'refresh': refresh}
+
+        refresh.set_jti()
+        refresh.set_exp()
+
+        # Compare-and-swap: only the holder of the family's current JTI can rotate it
+        rotated = TokenFamily.objects.filter(
+            pk=family_id,
+            current_jti=old_jti,
+            revoked_at__isnull=True
+        ).update(
+            current_jti=refresh[api_settings.JTI_CLAIM],
+            rotated_at=timezone.now(),
+            expires_at=datetime_from_epoch(refresh['exp'])
+        )
+
+        if rotated:
+            record_last_login(user_id)
+            return {'success': True, 'refresh': refresh}
+
+        # A stale JTI means this token was already rotated: someone is
+        # replaying it, so the whole family is shut down
+        revoked = TokenFamily.objects.filter(pk=family_id, revoked_at__isnull=True).update(revoked_at=timezone.now())
+
+        if revoked:
+            logger.warning(
+                _("Refresh token reuse detected, token family revoked"),
+                extra={'user_id': user_id, 'family_id': family_id}
+            )
+
+        return {
+            'success': False,
+            'error': _("Invalid or Expired authentication token"),
+            'error_type': 'token_reused'
+        }
+
+    @staticmethod
+    def revoke(raw_token):
+        try:
+            refresh = RefreshToken(raw_token)
+        except TokenError:
+            return False
+
+        family_id = refresh.get(FAMILY_CLAIM)
+
+        if family_id is None:
+            return refresh.revoke()
+
+        return TokenFamily.objects.using(
+            sharding.shard_for_key(refresh[api_settings.USER_ID_CLAIM])
+        ).filter(pk=family_id, revoked_at__isnull=True).update(revoked_at=timezone.now()) > 0
+
+    @staticmethod
+    def revoke_all_for_users(user_ids):
+        revoked = 0
+        now = timezone.now()
+
+        for alias, shard_user_ids in sharding.group_by_shard(user_ids).items():
+            revoked += TokenFamily.objects.using(alias).filter(
+                user_id__in=shard_user_ids,
+                revoked_at__isnull=True
+            ).update(revoked_at=now)
+
+        return revoked
+
+
+class SignupService:
+    @staticmethod
+    def build_user(phone_number, first_name, last_name):
+        user = User(phone_number=phone_number, first_name=first_name, last_name=last_name)
+        # Same value set_unusable_password() produces, without drawing the
+        # random suffix one character at a time
+        user.password = UNUSABLE_PASSWORD_PREFIX + secrets.token_urlsafe(30)
+        return user
+
+    @staticmethod
+    def build_profile(user_id):
+        # Sharded profiles reuse the global user id so profile ids stay unique across shards
+        return Profile(pk=user_id if sharding.is_enabled() else None, user_id=user_id, is_host=False)
+
+    @staticmethod
+    def signup(phone_number, first_name, last_name):
+        user = SignupService.build_user(phone_number, first_name, last_name)
+        conflict = {
+            'success': False,
+            'error': _("User with this phone number already exists"),
+            'error_type': 'conflict_error'
+        }
+
+        if sharding.is_enabled():
+            try:
+                user.pk = directory.register(phone_number)
+            except IntegrityError:
+                return conflict
+
+        alias = sharding.shard_for_key(user.pk)
+
+        # bulk_create skips post_save, so the profile is created here instead
+        # of by profiles.signals.handle_user_signup, and Profile.save()'s
+        # full_clean() is not run for a row that has no username yet
+        try:
+            with sharding.use_shard(alias):
+                refresh = run_in_write_transaction(SignupService._create, user, using=alias)
+        except IntegrityError:
+            if sharding.is_enabled():
+                directory.unregister(user.pk)
+            return conflict
+
+        return {'success': True, 'user': user, 'refresh': refresh}
+
+    @staticmethod
+    def create_batch(users, on_created=None):
+        if sharding.is_enabled():
+            user_ids = directory.register_many([user.phone_number for user in users])
+            for user in users:
+                user.pk = user_ids[user.phone_number]
+
+        profiles = {}
+
+        for alias, shard_users in sharding.group_by_shard(users, key=lambda user: user.pk).items():
+            with transaction.atomic(using=alias), sharding.use_shard(alias):
+                # Phone numbers that already exist are skipped by the unique constraint
+                User.objects.bulk_create(shard_users, ignore_conflicts=True)
+                created = {
+                    phone_number: SignupService.build_profile(user_id)
+                    for user_id, phone_number in User.objects.filter(
+                        phone_number__in=[user.phone_number for user in shard_users],
+                        profile__isnull=True
+                    ).values_list('pk', 'phone_number')
+                }
+                Profile.objects.bulk_create(created.values())
+
+                # Lets callers add rows of their own to the same shard transaction
+                if on_created is not None:
+                    on_created(alias, created)
+
+            profiles.update(created)
+
+        return profiles
+
+    @staticmethod
+    def _create(user):
+        User.objects.bulk_create([user])
+        Profile.objects.bulk_create([SignupService.build_profile(user.pk)])
+        return TokenService.issue_for_user(user)
+
+    @staticmethod
+    def bulk_signup(rows, batch_size=1000):
+        created = 0
+
+        for start in range(0, len(rows), batch_size):
+            users = [SignupService.build_user(**row) for row in rows[start:start + batch_size]]
+            created += len(SignupService.create_batch(users))
+
+        return created
@@ -0,0 +1,344 @@
+import logging
+import os
+import random
+import sys
+import threading
+import time
+import uuid
+import requests
+from requests.adapters import HTTPAdapter
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.utils.translation import gettext_lazy as _
+from .circuit_breaker import CircuitBreaker
+logger = logging.getLogger('authentication')
+
+
+class BaseSMSBackend:
+    def __init__(self, name, **options):
+        self.name = name
+        self.options = options
+
+    def validate(self):
+        pass
+
+    def send_otp(self, phone_number, otp_code):
+        raise NotImplementedError
+
+    def is_available(self):
+        return True
+
+    def retry_after(self):
+        return 0
+
+    def get_stats(self):
+        return {}
+
+
+class SMSIRBackend(BaseSMSBackend):
+    def __init__(self, name, **options):
+        super().__init__(name, **options)
+        self.api_key = options.get('api_key', settings.SMSIR_API_KEY)
+        self.template_id = options.get('template_id', settings.SMSIR_TEMPLATE_ID)
+        self.base_url = options.get('base_url', settings.SMSIR_BASE_URL)
+        self.line_number = options.get('line_number', settings.SMSIR_LINE_NUMBER)
+        self.timeout = (
+            options.get('connect_timeout', settings.SMSIR_CONNECT_TIMEOUT_SECONDS),
+            options.get('read_timeout', settings.SMSIR_READ_TIMEOUT_SECONDS),
+        )
+        self.pool_maxsize = options.get('pool_maxsize', settings.SMSIR_POOL_MAXSIZE)
+        self.max_retries = options.get('max_retries', settings.SMSIR_MAX_RETRIES)
+        self.retry_backoff = options.get('retry_backoff', settings.SMSIR_RETRY_BACKOFF_SECONDS)
+        self.breaker = CircuitBreaker(
+            name,
+            failure_threshold=options.get('failure_threshold', settings.SMSIR_CIRCUIT_FAILURE_THRESHOLD),
+            recovery_timeout=options.get('recovery_timeout', settings.SMSIR_CIRCUIT_RECOVERY_SECONDS)
+        )
+        self._session = None
+        self._session_pid = None
+        self._session_lock = threading.Lock()
+
+    def validate(self):
+        if not self.api_key:
+            raise ImproperlyConfigured(_("SMSIR_API_KEY is not configured in settings"))
+
+        if not self.template_id:
+            raise ImproperlyConfigured(_("SMSIR_TEMPLATE_ID is not configured in settings"))
+
+        try:
+            self.template_id = int(self.template_id)
+        except (ValueError, TypeError):
+            raise ImproperlyConfigured(_("SMSIR_TEMPLATE_ID must be a valid integer"))
+
+        if not self.base_url:
+            raise ImproperlyConfigured(_("SMSIR_BASE_URL is not configured in settings"))
+
+    def get_session(self):
+        # Sessions are not fork-safe, so each worker process builds its own pool
+        pid = os.getpid()
+
+        if self._session is None or self._session_pid != pid:
+            with self._session_lock:
+                if self._session is None or self._session_pid != pid:
+                    session = requests.Session()
+                    adapter = HTTPAdapter(
+                        pool_connections=1,
+                        pool_maxsize=self.pool_maxsize,
+                        max_retries=0
+                    )
+                    session.mount('https://', adapter)
+                    session.mount('http://', adapter)
+                    session.headers.update({
+                        'Content-Type': 'application/json',
+                        'Accept': 'application/json',
+                        'X-API-KEY': self.api_key
+                    })
+                    self._session = session
+                    self._session_pid = pid
+
+        return self._session
+
+    def is_available(self):
+        return not self.breaker.is_open()
+
+    def retry_after(self):
+        return self.breaker.retry_after()
+
+    def get_stats(self):
+        pools = []
+        session = self._session
+
+        if session is not None and self._session_pid == os.getpid():
+            adapter = session.get_adapter(self.base_url)
+            for key in adapter.poolmanager.pools.keys():
+                pool = adapter.poolmanager.pools.get(key)
+                if pool is None:
+                    continue
+                pools.append({
+                    'host': pool.host,
+                    'port': pool.port,
+                    'maxsize': self.pool_maxsize,
+                    'idle_connections': pool.pool.qsize() if pool.pool else 0,
+                    'connections_opened': pool.num_connections,
+                    'requests_sent': pool.num_requests,
+                })
+
+        return {
+            'circuit_breaker': self.breaker.get_stats(),
+            'pools': pools,
+        }
+
+    def _post_with_retries(self, url, payload):
+        session = self.get_session()
+        attempt = 0
+
+        # Only failures before the request reached the provider are retried;
+        # after a read timeout it may already have sent (and billed) the SMS
+        while True:
+            try:
+                return session.post(url, json=payload, timeout=self.timeout)
+            except (requests.exceptions.ConnectTimeout, requests.exceptions.ConnectionError):
+                if attempt >= self.max_retries:
+                    raise
+                # Full jitter keeps retries from many workers from arriving in lockstep
+                delay = random.uniform(0, self.retry_backoff * (2 ** attempt))
+                attempt += 1
+                logger.warning(
+                    _("SMS provider request failed, retrying"),
+                    extra={'backend': self.name, 'url': url, 'attempt': attempt, 'delay': round(delay, 3)}
+                )
+                time.sleep(delay)
+
+    def send_otp(self, phone_number, otp_code):
+        if not self.breaker.allow_request():
+            logger.warning(
+                _("SMS provider circuit is open, request rejected"),
+                extra={
+                    'backend': self.name,
+                    'phone_number': phone_number[:6] + '*****',
+                    'retry_after': self.breaker.retry_after()
+                }
+            )
+            return {
+                'success': False,
+                'internal_error': _("SMS service circuit breaker is open"),
+                'error_type': 'connection_error',
+                'retry_after': self.breaker.retry_after()
+            }
+
+        url = f'{self.base_url}/send/verify'
+
+        payload = {
+            "mobile": phone_number,
+            "templateId": int(self.template_id),
+            "parameters": [
+                {"name": "CODE", "value": otp_code}
+            ]
+        }
+
+        if self.line_number:
+            payload['lineNumber'] = self.line_number
+
+        try:
+            response = self._post_with_retries(url, payload)
+
+            if response.status_code >= 500:
+                self.breaker.record_failure()
+            else:
+                self.breaker.record_success()
+
+            try:
+                response_data = response.json()
+            except ValueError:
+                response_data = {}
+
+            if response.status_code == 200 and response_data.get('status') == 1:
+                return {
+                    'success': True,
+                    'message_id': response_data.get('data', {}).get('messageId')
+                }
+
+            provider_message = response_data.get('message', 'Unknown provider error')
+
+            logger.error(
+                _("SMS provider returned an error"),
+                extra={
+                    'backend': self.name,
+                    'phone_number': phone_number[:6] + '*****',
+                    'status_code': response.status_code,
+                    'provider_message': provider_message,
+                    'response_data': response_data
+                }
+            )
+
+            return {
+                'success': False,
+                'internal_error': _("SMS provider error: {error}").format(
+                    error=provider_message
+                ),
+                'error_type': 'provider_error'
+            }
+
+        except requests.exceptions.Timeout:
+            self.breaker.record_failure()
+            logger.error(
+                _("SMS provider timeout occurred"),
+                extra={'backend': self.name, 'phone_number': phone_number[:6] + '*****', 'url': url}
+            )
+            return {
+                'success': False,
+                'internal_error': _("SMS service timeout"),
+                'error_type': 'timeout_error'
+            }
+
+        except requests.exceptions.RequestException as e:
+            self.breaker.record_failure()
+            logger.error(
+                _("SMS provider connection error occurred"),
+                extra={
+                    'backend': self.name,
+                    'phone_number': phone_number[:6] + '*****',
+                    'url': url,
+                    'error': str(e)
+                }
+            )
+            return {
+                'success': False,
+                'internal_error': _("SMS service connection error"),
+                'error_type': 'connection_error'
+            }
+
+        except Exception as e:
+            logger.exception(
+                _("Unexpected error occurred during SMS send"),
+                extra={
+                    'backend': self.name,
+                    'phone_number': phone_number[:6] + '*****',
+                    'error': str(e)
+                }
+            )
+            return {
+                'success': False,
+                'internal_error': _("Unexpected SMS error: {error}").format(error=str(e)),
+                'error_type': 'unknown_error'
+            }
+
+
+class ConsoleSMSBackend(BaseSMSBackend):
+    def __init__(self, name, **options):
+        super().__init__(name, **options)
+        self.file_path = options.get('file_path') or ''
+        self._lock = threading.Lock()
+
+    def validate(self):
+        if self.file_path:
+            directory = os.path.dirname(os.path.abspath(self.file_path))
+            if not os.path.isdir(directory):
+                raise ImproperlyConfigured(
+                    _("SMS console backend directory does not exist: {path}").format(path=directory)
+                )
+
+    def send_otp(self, phone_number, otp_code):
+        message_id = f'{self.name}-{uuid.uuid4().hex[:12]}'
+        line = f'[{self.name}] OTP {otp_code} -> {phone_number} ({message_id})\n'
+
+        with self._lock:
+            if self.file_path:
+                with open(self.file_path, 'a', encoding='utf-8') as stream:
+                    stream.write(line)
+            else:
+                sys.stdout.write(line)
+                sys.stdout.flush()
+
+        return {
+            'success': True,
+            'message_id': message_id
+        }
+
+
+class LocMemSMSBackend(BaseSMSBackend):
+    outbox = []
+    _lock = threading.Lock()
+
+    def __init__(self, name, **options):
+        super().__init__(name, **options)
+        self.fail_rate = float(options.get('fail_rate', 0))
+        self.latency = float(options.get('latency_ms', 0)) / 1000
+
+    def validate(self):
+        if not 0 <= self.fail_rate <= 1:
+            raise ImproperlyConfigured(_("SMS locmem backend fail_rate must be between 0 and 1"))
+
+    def send_otp(self, phone_number, otp_code):
+        if self.latency:
+            time.sleep(self.latency)
+
+        if self.fail_rate and random.random() < self.fail_rate:
+            return {
+                'success': False,
+                'internal_error': _("Simulated SMS failure"),
+                'error_type': 'provider_error'
+            }
+
+        message_id = f'{self.name}-{uuid.uuid4().hex[:12]}'
+
+        with LocMemSMSBackend._lock:
+            LocMemSMSBackend.outbox.append({
+                'backend': self.name,
+                'phone_number': phone_number,
+                'otp_code': otp_code,
+                'message_id': message_id,
+            })
+
+        return {
+            'success': True,
+            'message_id': message_id
+        }
+
+    def get_stats(self):
+        return {'sent_messages': len(LocMemSMSBackend.outbox)}
+
+    @staticmethod
+    def reset():
+        with LocMemSMSBackend._lock:
+            LocMemSMSBackend.outbox.clear()
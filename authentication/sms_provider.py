@@ -1,146 +1,215 @@
 import logging
-import requests
+import os
+import threading
+import time
+from collections import deque
 from django.conf import settings
 from django.core.exceptions import ImproperlyConfigured
+from django.utils.module_loading import import_string
 from django.utils.translation import gettext_lazy as _
 logger = logging.getLogger('authentication')
 
 
-class SMSProvider:
-    @staticmethod
-    def _validate_settings():
-        if not settings.SMSIR_API_KEY:
-            logger.critical(
-                _("SMS configuration error detected"),
-                extra={'config_key': 'SMSIR_API_KEY', 'issue': 'not_configured'}
-            )
-            raise ImproperlyConfigured(_("SMSIR_API_KEY is not configured in settings"))
+DEFAULT_FAILOVER = {
+    'WINDOW_SIZE': 20,
+    'MIN_SAMPLES': 5,
+    'MAX_ERROR_RATE': 0.5,
+    'MAX_LATENCY_MS': 3000,
+    'COOLDOWN_SECONDS': 60,
+}
 
-        if not settings.SMSIR_TEMPLATE_ID:
-            logger.critical(
-                _("SMS configuration error detected"),
-                extra={'config_key': 'SMSIR_TEMPLATE_ID', 'issue': 'not_configured'}
-            )
-            raise ImproperlyConfigured(_("SMSIR_TEMPLATE_ID is not configured in settings"))
-
-        try:
-            int(settings.SMSIR_TEMPLATE_ID)
-        except (ValueError, TypeError):
-            logger.critical(
-                _("SMS configuration error detected"),
-                extra={'config_key': 'SMSIR_TEMPLATE_ID', 'issue': 'invalid_format'}
-            )
-            raise ImproperlyConfigured(_("SMSIR_TEMPLATE_ID must be a valid integer"))
 
-        if not settings.SMSIR_BASE_URL:
-            logger.critical(
-                _("SMS configuration error detected"),
-                extra={'config_key': 'SMSIR_BASE_URL', 'issue': 'not_configured'}
-            )
-            raise ImproperlyConfigured(_("SMSIR_BASE_URL is not configured in settings"))
-
-    @staticmethod
-    def send_otp(phone_number, otp_code):
-        try:
-            SMSProvider._validate_settings()
-        except ImproperlyConfigured as e:
-            logger.critical(
-                _("SMS configuration error detected"),
-                extra={'error': str(e)}
-            )
-            return {
-                'success': False,
-                'internal_error': str(e),
-                'error_type': 'configuration_error'
-            }
+class BackendHealth:
+    def __init__(self, window_size):
+        self.samples = deque(maxlen=window_size)
+        self.degraded_until = 0
+        self._lock = threading.Lock()
+
+    def record(self, success, latency_ms):
+        with self._lock:
+            self.samples.append((success, latency_ms))
+
+    def is_degraded(self):
+        return time.monotonic() < self.degraded_until
+
+    def snapshot(self):
+        with self._lock:
+            samples = list(self.samples)
 
-        url = f'{settings.SMSIR_BASE_URL}/send/verify'
+        count = len(samples)
+        errors = sum(1 for success, _latency in samples if not success)
+        total_latency = sum(latency for _success, latency in samples)
 
-        headers = {
-            'Content-Type': 'application/json',
-            'Accept': 'application/json',
-            'X-API-KEY': settings.SMSIR_API_KEY
+        return {
+            'samples': count,
+            'error_rate': round(errors / count, 3) if count else 0.0,
+            'avg_latency_ms': round(total_latency / count, 1) if count else 0.0,
+            'degraded': self.is_degraded(),
         }
 
-        payload = {
-            "mobile": phone_number,
-            "templateId": int(settings.SMSIR_TEMPLATE_ID),
-            "parameters": [
-                {"name": "CODE", "value": otp_code}
-            ]
+    def evaluate(self, failover):
+        stats = self.snapshot()
+
+        if stats['samples'] < failover['MIN_SAMPLES']:
+            return False
+
+        if stats['error_rate'] <= failover['MAX_ERROR_RATE'] and stats['avg_latency_ms'] <= failover['MAX_LATENCY_MS']:
+            return False
+
+        # Start from a clean window so the backend gets a fair trial after the cooldown
+        with self._lock:
+            self.degraded_until = time.monotonic() + failover['COOLDOWN_SECONDS']
+            self.samples.clear()
+
+        return True
+
+
+class SMSProvider:
+    def __init__(self, backends, failover=None):
+        self.backends = backends
+        self.failover = {**DEFAULT_FAILOVER, **(failover or {})}
+        self.health = {
+            backend.name: BackendHealth(self.failover['WINDOW_SIZE'])
+            for backend in backends
         }
 
-        if settings.SMSIR_LINE_NUMBER:
-            payload['lineNumber'] = settings.SMSIR_LINE_NUMBER
+    @classmethod
+    def from_settings(cls):
+        backends = []
 
-        try:
-            response = requests.post(
-                url, json=payload, headers=headers, timeout=10
-            )
-            response_data = response.json()
+        for name in settings.SMS_BACKENDS:
+            definition = settings.SMS_BACKEND_DEFINITIONS.get(name)
 
-            if response.status_code == 200 and response_data.get('status') == 1:
-                return {
-                    'success': True,
-                    'message_id': response_data.get('data', {}).get('messageId')
-                }
+            if definition is None:
+                raise ImproperlyConfigured(
+                    _("SMS backend '{name}' is not defined in SMS_BACKEND_DEFINITIONS").format(name=name)
+                )
 
-            provider_message = response_data.get('message', 'Unknown provider error')
+            backend_class = import_string(definition['BACKEND'])
+            backends.append(backend_class(name, **definition.get('OPTIONS', {})))
 
-            logger.error(
-                _("SMS provider returned an error"),
-                extra={
-                    'phone_number': phone_number[:6] + '*****',
-                    'status_code': response.status_code,
-                    'provider_message': provider_message,
-                    'response_data': response_data
-                }
-            )
+        return cls(backends, settings.SMS_FAILOVER)
 
-            return {
-                'success': False,
-                'internal_error': _("SMS provider error: {error}").format(
-                    error=provider_message
-                ),
-                'error_type': 'provider_error'
-            }
+    def validate(self):
+        errors = []
 
-        except requests.exceptions.Timeout:
-            logger.error(
-                _("SMS provider timeout occurred"),
-                extra={'phone_number': phone_number[:6] + '*****', 'url': url}
-            )
+        for backend in self.backends:
+            try:
+                backend.validate()
+            except ImproperlyConfigured as e:
+                errors.append((backend, e))
+
+        return errors
+
+    def without_backends(self, excluded):
+        excluded_names = {backend.name for backend in excluded}
+        return SMSProvider(
+            [backend for backend in self.backends if backend.name not in excluded_names],
+            self.failover
+        )
+
+    def _ordered_backends(self):
+        preferred = []
+        fallback = []
+
+        for backend in self.backends:
+            if self.health[backend.name].is_degraded() or not backend.is_available():
+                fallback.append(backend)
+            else:
+                preferred.append(backend)
+
+        return preferred + fallback
+
+    def is_available(self):
+        return any(backend.is_available() for backend in self.backends)
+
+    def retry_after(self):
+        if not self.backends:
+            return 0
+        return min(backend.retry_after() for backend in self.backends)
+
+    def send_otp(self, phone_number, otp_code):
+        if not self.backends:
             return {
                 'success': False,
-                'internal_error': _("SMS service timeout"),
-                'error_type': 'timeout_error'
+                'internal_error': _("No valid SMS backend is configured"),
+                'error_type': 'configuration_error'
             }
 
-        except requests.exceptions.RequestException as e:
-            logger.error(
-                _("SMS provider connection error occurred"),
+        result = None
+
+        for backend in self._ordered_backends():
+            started = time.monotonic()
+            result = backend.send_otp(phone_number, otp_code)
+            latency_ms = (time.monotonic() - started) * 1000
+
+            health = self.health[backend.name]
+            health.record(result['success'], latency_ms)
+
+            if health.evaluate(self.failover):
+                logger.warning(
+                    _("SMS backend degraded, failing over"),
+                    extra={'backend': backend.name, 'cooldown': self.failover['COOLDOWN_SECONDS']}
+                )
+
+            if result['success']:
+                result['backend'] = backend.name
+                return result
+
+            logger.warning(
+                _("SMS backend failed, trying next backend"),
                 extra={
+                    'backend': backend.name,
                     'phone_number': phone_number[:6] + '*****',
-                    'url': url,
-                    'error': str(e)
+                    'error_type': result.get('error_type', 'unknown_error')
                 }
             )
-            return {
-                'success': False,
-                'internal_error': _("SMS service connection error"),
-                'error_type': 'connection_error'
-            }
 
-        except Exception as e:
-            logger.exception(
-                _("Unexpected error occurred during SMS send"),
-                extra={
-                    'phone_number': phone_number[:6] + '*****',
-                    'error': str(e)
+        return result
+
+    def get_stats(self):
+        return {
+            'pid': os.getpid(),
+            'failover': self.failover,
+            'backends': [
+                {
+                    'name': backend.name,
+                    'backend': f'{type(backend).__module__}.{type(backend).__name__}',
+                    'available': backend.is_available(),
+                    **self.health[backend.name].snapshot(),
+                    **backend.get_stats(),
                 }
-            )
-            return {
-                'success': False,
-                'internal_error': _("Unexpected SMS error: {error}").format(error=str(e)),
-                'error_type': 'unknown_error'
-            }
+                for backend in self.backends
+            ],
+        }
+
+
+_provider = None
+_provider_lock = threading.Lock()
+
+
+def get_sms_provider():
+    global _provider
+
+    if _provider is None:
+        with _provider_lock:
+            if _provider is None:
+                provider = SMSProvider.from_settings()
+                errors = provider.validate()
+
+                for backend, error in errors:
+                    logger.critical(
+                        _("SMS configuration error detected"),
+                        extra={'backend': backend.name, 'error': str(error)}
+                    )
+
+                _provider = provider.without_backends([backend for backend, _error in errors])
+
+    return _provider
+
+
+def reset_sms_provider():
+    global _provider
+
+    with _provider_lock:
+        _provider = None
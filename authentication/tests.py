@@ -1,3 +1,400 @@
-from django.test import TestCase
+import os
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.exceptions import ImproperlyConfigured
+from django.db import OperationalError, connection
+from django.db.migrations.executor import MigrationExecutor
+from django.test import RequestFactory, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+import requests
+from cryptography.hazmat.primitives.asymmetric import ed25519
+from rest_framework.request import Request
+from rest_framework_simplejwt.exceptions import TokenBackendError
+from rest_framework_simplejwt.state import token_backend as default_token_backend
+from .jwt_keys import KeyRingTokenBackend, SigningKey, parse_legacy_cutoff
+from .last_login import get_last_login_buffer, reset_last_login_buffer
+from profiles.models import Interest, Profile
+from .models import OTP, RevokedToken, SMSOutbox, User
+from .otp_store import StatelessOTPStore, reset_otp_store
+from .ratelimit import RequestOTPRateThrottle
+from .sms_backends import SMSIRBackend
+from .services import OTPService, SignupService, SMSOutboxService
+from .tokens import RefreshToken
 
-# Create your tests here.
+
+class CountingSMSProvider:
+    def __init__(self):
+        self.sent = []
+        self._lock = threading.Lock()
+
+    def is_available(self):
+        return True
+
+    def retry_after(self):
+        return 0
+
+    def send_otp(self, phone_number, otp_code):
+        with self._lock:
+            self.sent.append((phone_number, otp_code))
+        return {'success': True}
+
+
+@override_settings(
+    SMS_DELIVERY_MODE='sync',
+    OTP_STORE={'BACKEND': 'authentication.otp_store.DatabaseOTPStore', 'OPTIONS': {}}
+)
+class ConcurrentOTPIssueTests(TransactionTestCase):
+    PHONE_NUMBER = '09123456789'
+    REQUESTS = 200
+    WORKERS = 32
+
+    def setUp(self):
+        reset_otp_store()
+        self.addCleanup(reset_otp_store)
+
+    def send(self, _i):
+        try:
+            return OTPService.send_otp(self.PHONE_NUMBER)
+        finally:
+            connection.close()
+
+    def test_burst_issues_one_otp_and_one_sms(self):
+        provider = CountingSMSProvider()
+
+        with mock.patch('authentication.services.get_sms_provider', return_value=provider):
+            with ThreadPoolExecutor(max_workers=self.WORKERS) as pool:
+                results = list(pool.map(self.send, range(self.REQUESTS)))
+
+        succeeded = [result for result in results if result['success']]
+        rate_limited = [result for result in results if result.get('error_type') == 'rate_limit_error']
+
+        self.assertEqual(len(succeeded), 1)
+        self.assertEqual(len(rate_limited), self.REQUESTS - 1)
+        self.assertEqual(OTP.objects.filter(phone_number=self.PHONE_NUMBER).count(), 1)
+        self.assertEqual(len(provider.sent), 1)
+        self.assertEqual(provider.sent[0][1], OTP.objects.get(phone_number=self.PHONE_NUMBER).otp_code)
+
+
+class StatelessOTPStoreTests(SimpleTestCase):
+    PHONE_NUMBER = '09123456789'
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.store = StatelessOTPStore(secret='test-secret')
+
+    def issue(self, expires_in=timedelta(minutes=2)):
+        now = timezone.now()
+        code = self.store.generate_code(self.PHONE_NUMBER, now)
+        otp, _retry_after = self.store.issue(self.PHONE_NUMBER, code, now + expires_in)
+        self.assertIsNotNone(otp)
+        return code
+
+    def test_no_code_verifies_without_an_issue(self):
+        self.assertFalse(any(
+            self.store.consume(self.PHONE_NUMBER, str(code).zfill(4))
+            for code in range(10000)
+        ))
+
+    def test_issued_code_verifies_once(self):
+        code = self.issue()
+
+        self.assertTrue(self.store.consume(self.PHONE_NUMBER, code))
+        self.assertFalse(self.store.consume(self.PHONE_NUMBER, code))
+
+    def test_wrong_code_does_not_consume_the_issue(self):
+        code = self.issue()
+        wrong = str((int(code) + 1) % 10000).zfill(4)
+
+        self.assertFalse(self.store.consume(self.PHONE_NUMBER, wrong))
+        self.assertTrue(self.store.consume(self.PHONE_NUMBER, code))
+
+    def test_code_expires_with_otp_expiry(self):
+        code = self.issue(expires_in=timedelta(seconds=30))
+
+        with mock.patch('authentication.otp_store.timezone.now', return_value=timezone.now() + timedelta(seconds=31)):
+            self.assertFalse(self.store.consume(self.PHONE_NUMBER, code))
+
+
+class KeyRingTokenBackendTests(SimpleTestCase):
+    def setUp(self):
+        private_key = ed25519.Ed25519PrivateKey.generate()
+        self.key = SigningKey('test', private_key, private_key.public_key())
+        self.legacy_token = default_token_backend.encode({'user_id': 1, 'token_type': 'access'})
+
+    def backend(self, legacy_until):
+        return KeyRingTokenBackend(
+            'EdDSA',
+            [self.key],
+            legacy_backend=default_token_backend if legacy_until else None,
+            legacy_until=legacy_until
+        )
+
+    def test_legacy_tokens_are_rejected_without_a_cutoff(self):
+        with self.assertRaises(TokenBackendError):
+            self.backend(None).decode(self.legacy_token)
+
+    def test_legacy_tokens_are_accepted_until_the_cutoff(self):
+        backend = self.backend(timezone.now() + timedelta(hours=1))
+        self.assertEqual(backend.decode(self.legacy_token)['user_id'], 1)
+
+        with mock.patch('authentication.jwt_keys.timezone.now', return_value=timezone.now() + timedelta(hours=2)):
+            with self.assertRaises(TokenBackendError):
+                backend.decode(self.legacy_token)
+
+    def test_cutoff_cannot_outlive_the_refresh_lifetime(self):
+        with self.assertRaises(ImproperlyConfigured):
+            parse_legacy_cutoff((timezone.now() + timedelta(days=30)).isoformat())
+
+    def test_jwks_is_pre_encoded(self):
+        backend = self.backend(None)
+        self.assertIn(b'"kid":"test"', backend.jwks_json)
+        self.assertEqual(backend.decode(backend.encode({'user_id': 2}))['user_id'], 2)
+
+
+class CopyBlacklistedTokensMigrationTests(TransactionTestCase):
+    before = [('authentication', '0006_userdirectory'), ('token_blacklist', '0013_alter_blacklistedtoken_options_and_more')]
+    after = [('authentication', '0007_copy_blacklisted_tokens')]
+
+    def migrate(self, targets):
+        executor = MigrationExecutor(connection)
+        executor.loader.build_graph()
+        executor.migrate(targets)
+        return executor.loader.project_state(targets).apps
+
+    def tearDown(self):
+        self.migrate(MigrationExecutor(connection).loader.graph.leaf_nodes())
+
+    def test_unexpired_blacklisted_jtis_are_copied(self):
+        apps = self.migrate(self.before)
+        OutstandingToken = apps.get_model('token_blacklist', 'OutstandingToken')
+        BlacklistedToken = apps.get_model('token_blacklist', 'BlacklistedToken')
+        now = timezone.now()
+
+        for jti, expires_at in (('live', now + timedelta(days=1)), ('expired', now - timedelta(days=1))):
+            token = OutstandingToken.objects.create(jti=jti, token='x', expires_at=expires_at)
+            BlacklistedToken.objects.create(token=token)
+        OutstandingToken.objects.create(jti='outstanding', token='x', expires_at=now + timedelta(days=1))
+
+        self.migrate(self.after)
+
+        self.assertEqual(list(RevokedToken.objects.values_list('jti', flat=True)), ['live'])
+
+
+class RefreshTokenBookkeepingTests(TransactionTestCase):
+    def test_issuing_writes_no_outstanding_token(self):
+        from rest_framework_simplejwt.token_blacklist.models import OutstandingToken
+
+        user = User.objects.create_user(phone_number='09123456780')
+        RefreshToken.for_user(user).verify()
+
+        self.assertFalse(OutstandingToken.objects.exists())
+
+
+class SignupQueryCountTests(TransactionTestCase):
+    def setUp(self):
+        # Signing up records a last login; it must not outlive the test database
+        self.addCleanup(reset_last_login_buffer)
+
+    def test_signup_is_one_transaction_of_three_inserts(self):
+        with CaptureQueriesContext(connection) as queries:
+            result = SignupService.signup('09123456781', 'Sara', 'Ahmadi')
+
+        self.assertTrue(result['success'])
+        self.assertEqual(
+            [query['sql'].split()[0] for query in queries.captured_queries],
+            ['BEGIN', 'INSERT', 'INSERT', 'INSERT', 'COMMIT']
+        )
+        self.assertEqual(
+            [query['sql'].split()[2].strip('"') for query in queries.captured_queries[1:4]],
+            ['users', 'profiles_profile', 'token_families']
+        )
+
+
+class ImportUsersCommandTests(TestCase):
+    ROWS = [
+        'phone_number,first_name,last_name,interests',
+        '09120000001,Sara,Ahmadi,art|chess',
+        '09120000002,Ali,Karimi,chess',
+        'not-a-phone,Bad,Row,',
+        '09120000001,Sara,Again,art',
+    ]
+
+    def setUp(self):
+        Interest.objects.create(name='Art', slug='art')
+        Interest.objects.create(name='Chess', slug='chess')
+
+        handle, self.path = tempfile.mkstemp(suffix='.csv')
+        with os.fdopen(handle, 'w') as csv_file:
+            csv_file.write('\n'.join(self.ROWS) + '\n')
+        self.addCleanup(os.remove, self.path)
+
+    def run_import(self, path=None, **options):
+        call_command('import_users', path or self.path, batch_size=1, stdout=open(os.devnull, 'w'), **options)
+
+    def test_import_creates_users_profiles_and_interest_links(self):
+        self.run_import()
+
+        self.assertEqual(User.objects.count(), 2)
+        self.assertEqual(Profile.objects.count(), 2)
+        self.assertEqual(
+            sorted(Profile.objects.get(user__phone_number='09120000001').interests.values_list('slug', flat=True)),
+            ['art', 'chess']
+        )
+
+    def test_import_is_idempotent(self):
+        self.run_import()
+        self.run_import()
+
+        self.assertEqual(User.objects.count(), 2)
+        self.assertEqual(Profile.interests.through.objects.count(), 3)
+
+    def test_malformed_ndjson_lines_are_counted_as_invalid(self):
+        handle, path = tempfile.mkstemp(suffix='.ndjson')
+        with os.fdopen(handle, 'w') as ndjson_file:
+            ndjson_file.write('\n'.join([
+                '{"phone_number": "09120000003", "first_name": "Reza", "interests": ["art"]}',
+                '{"phone_number": "09120000004",',
+                '["not", "an", "object"]',
+                '{"phone_number": "09120000005", "first_name": "Mina"}',
+            ]) + '\n')
+        self.addCleanup(os.remove, path)
+        stderr = StringIO()
+
+        self.run_import(path, stderr=stderr)
+
+        self.assertEqual(User.objects.count(), 2)
+        self.assertEqual(stderr.getvalue().splitlines(), [
+            'line 2: not a JSON object, skipped',
+            'line 3: not a JSON object, skipped',
+        ])
+
+
+@override_settings(SMS_DELIVERY_MODE='outbox')
+class OTPIssueRetryTests(TransactionTestCase):
+    PHONE_NUMBER = '09123456782'
+
+    def setUp(self):
+        cache.clear()
+        reset_otp_store()
+        self.addCleanup(reset_otp_store)
+        self.addCleanup(cache.clear)
+
+    def issue_with_one_lock_error(self):
+        enqueue = SMSOutboxService.enqueue
+        calls = []
+
+        def locked_once(*args, **kwargs):
+            calls.append(args)
+            if len(calls) == 1:
+                raise OperationalError('database is locked')
+            return enqueue(*args, **kwargs)
+
+        provider = CountingSMSProvider()
+        with mock.patch('authentication.services.get_sms_provider', return_value=provider), \
+                mock.patch.object(SMSOutboxService, 'enqueue', side_effect=locked_once):
+            result = OTPService.send_otp(self.PHONE_NUMBER)
+
+        self.assertEqual(len(calls), 2)
+        return result
+
+    def assert_issued_after_retry(self, store):
+        with override_settings(OTP_STORE={'BACKEND': f'authentication.otp_store.{store}', 'OPTIONS': {}}):
+            reset_otp_store()
+            result = self.issue_with_one_lock_error()
+
+        self.assertTrue(result['success'])
+        self.assertEqual(SMSOutbox.objects.filter(phone_number=self.PHONE_NUMBER).count(), 1)
+
+    def test_cache_store_retry_reclaims_the_slot(self):
+        self.assert_issued_after_retry('CacheOTPStore')
+
+    def test_stateless_store_retry_reclaims_the_slot(self):
+        self.assert_issued_after_retry('StatelessOTPStore')
+
+    def test_database_store_retry_reclaims_the_slot(self):
+        self.assert_issued_after_retry('DatabaseOTPStore')
+
+
+@override_settings(OTP_RATE_LIMITS={'request_otp': {'global': '20/1m', 'ip': '5/10m'}})
+class OTPRateThrottleTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+
+    def allow(self, ip):
+        request = Request(RequestFactory().post('/', REMOTE_ADDR=ip))
+        return RequestOTPRateThrottle().allow_request(request, None)
+
+    def test_one_noisy_ip_does_not_spend_the_global_budget(self):
+        allowed = [self.allow('10.0.0.1') for _i in range(25)]
+
+        self.assertEqual(allowed.count(True), 5)
+        self.assertTrue(self.allow('10.0.1.1'))
+
+
+class SMSIRRetryTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.backend = SMSIRBackend(
+            'smsir', api_key='key', template_id='1', base_url='https://sms.example', retry_backoff=0
+        )
+
+    def send(self, *outcomes):
+        response = mock.Mock(status_code=200)
+        response.json.return_value = {'status': 1, 'data': {'messageId': 1}}
+        outcomes = [response if outcome is None else outcome for outcome in outcomes]
+
+        with mock.patch.object(self.backend.get_session(), 'post', side_effect=outcomes) as post:
+            result = self.backend.send_otp('09123456789', '1234')
+
+        return result, post.call_count
+
+    def test_connection_failures_are_retried(self):
+        result, calls = self.send(requests.exceptions.ConnectTimeout(), requests.exceptions.ConnectionError(), None)
+
+        self.assertTrue(result['success'])
+        self.assertEqual(calls, 3)
+
+    def test_read_timeout_is_not_retried(self):
+        result, calls = self.send(requests.exceptions.ReadTimeout(), None)
+
+        self.assertEqual(result['error_type'], 'timeout_error')
+        self.assertEqual(calls, 1)
+
+
+class LastLoginBufferTests(TestCase):
+    def setUp(self):
+        reset_last_login_buffer()
+        self.addCleanup(reset_last_login_buffer)
+
+    def test_flush_writes_pending_logins(self):
+        user = User.objects.create_user(phone_number='09120000040')
+        buffer = get_last_login_buffer()
+        buffer.record(user.pk)
+
+        self.assertEqual(buffer.flush(), 1)
+        user.refresh_from_db()
+        self.assertIsNotNone(user.last_login)
+
+    def test_reset_drops_pending_logins_and_the_exit_flush(self):
+        buffer = get_last_login_buffer()
+
+        with mock.patch('authentication.last_login.atexit') as exit_hooks:
+            buffer.record(1)
+            exit_hooks.register.assert_called_once_with(buffer._flush_at_exit)
+
+            reset_last_login_buffer()
+            exit_hooks.unregister.assert_called_once_with(buffer._flush_at_exit)
+
+        self.assertEqual(buffer.pending, {})
+        buffer._thread.join(timeout=1)
+        self.assertFalse(buffer._thread.is_alive())
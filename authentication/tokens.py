@@ -0,0 +1,46 @@
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt import tokens
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings
+from .jwt_keys import get_token_backend
+from .revocation import get_revocation_store
+
+FAMILY_CLAIM = 'fam'
+
+
+class KeyRingTokenMixin:
+    @property
+    def token_backend(self):
+        return get_token_backend()
+
+    def get_token_backend(self):
+        return get_token_backend()
+
+
+class AccessToken(KeyRingTokenMixin, tokens.AccessToken):
+    pass
+
+
+class RefreshToken(KeyRingTokenMixin, tokens.RefreshToken):
+    access_token_class = AccessToken
+
+    # token_blacklist is installed only for its data migration; revocation goes
+    # through the revocation store, so outstanding rows are never written or read
+    @classmethod
+    def for_user(cls, user):
+        return super(tokens.BlacklistMixin, cls).for_user(user)
+
+    def outstand(self):
+        return None
+
+    def check_blacklist(self):
+        pass
+
+    def verify(self, *args, **kwargs):
+        super().verify(*args, **kwargs)
+
+        if get_revocation_store().is_revoked(self.payload[api_settings.JTI_CLAIM]):
+            raise TokenError(_("Token is blacklisted"))
+
+    def revoke(self):
+        return get_revocation_store().revoke(self.payload[api_settings.JTI_CLAIM], self.payload['exp'])
@@ -1,5 +1,13 @@
 from django.urls import path
-from .views import RequestOTPView, VerifyOTPView, CompleteSignupView, RefreshTokenView, LogoutView
+from .views import (
+    RequestOTPView,
+    VerifyOTPView,
+    CompleteSignupView,
+    RefreshTokenView,
+    LogoutView,
+    SMSProviderStatusView,
+    AuthCacheStatusView,
+)
 
 urlpatterns = [
     path('request-otp/', RequestOTPView.as_view(), name='request-otp'),
@@ -7,4 +15,6 @@ urlpatterns = [
     path('complete-signup/', CompleteSignupView.as_view(), name='complete-signup'),
     path('refresh-token/', RefreshTokenView.as_view(), name='refresh-token'),
     path('logout/', LogoutView.as_view(), name='logout'),
+    path('sms-provider/status/', SMSProviderStatusView.as_view(), name='sms-provider-status'),
+    path('auth-cache/status/', AuthCacheStatusView.as_view(), name='auth-cache-status'),
 ]
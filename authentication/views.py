@@ -1,16 +1,20 @@
 import logging
 from django.conf import settings
-from django.db import transaction
+from django.http import HttpResponse
+from django.utils.cache import patch_cache_control
 from django.utils.translation import gettext_lazy as _
 from rest_framework import status
 from rest_framework.views import APIView
 from rest_framework.response import Response
-from rest_framework.permissions import AllowAny, IsAuthenticated
-from rest_framework_simplejwt.tokens import RefreshToken
-from rest_framework_simplejwt.exceptions import TokenError
-from .models import User
+from rest_framework.permissions import AllowAny, IsAuthenticated, IsAdminUser
 from .serializers import RequestOTPSerializer, VerifyOTPSerializer, CompleteSignupSerializer
-from .services import OTPService, SignupTokenService
+from .services import OTPService, SignupService, SignupTokenService, TokenService
+from .caching import TokenCache, UserCache
+from .directory import get_user_by_phone
+from .jwt_keys import get_token_backend
+from .ratelimit import RequestOTPRateThrottle, VerifyOTPRateThrottle
+from .revocation import get_revocation_store
+from .sms_provider import get_sms_provider
 from .validators import mask_phone_number
 
 logger = logging.getLogger('authentication')
@@ -18,6 +22,7 @@ logger = logging.getLogger('authentication')
 
 class RequestOTPView(APIView):
     permission_classes = [AllowAny]
+    throttle_classes = [RequestOTPRateThrottle]
 
     def post(self, request):
         serializer = RequestOTPSerializer(data=request.data)
@@ -51,7 +56,7 @@ class RequestOTPView(APIView):
             }
             response = Response(response_data, status=status_code)
 
-            if error_type == 'rate_limit_error' and 'retry_after' in result:
+            if 'retry_after' in result:
                 response['Retry-After'] = str(result['retry_after'])
 
             return response
@@ -64,6 +69,7 @@ class RequestOTPView(APIView):
 
 class VerifyOTPView(APIView):
     permission_classes = [AllowAny]
+    throttle_classes = [VerifyOTPRateThrottle]
 
     def post(self, request):
         serializer = VerifyOTPSerializer(data=request.data)
@@ -89,10 +95,10 @@ class VerifyOTPView(APIView):
             extra={'phone_number': mask_phone_number(phone_number)}
         )
 
-        user = User.objects.filter(phone_number=phone_number).first()
+        user = get_user_by_phone(phone_number)
 
         if user:
-            refresh = RefreshToken.for_user(user)
+            refresh = TokenService.issue_for_user(user)
 
             response = Response(
                 {"access": str(refresh.access_token)},
@@ -141,39 +147,34 @@ class CompleteSignupView(APIView):
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-        if User.objects.filter(phone_number=phone_number).exists():
-            return Response(
-                {"error": _("User with this phone number already exists")},
-                status=status.HTTP_409_CONFLICT
-            )
-
         try:
-            with transaction.atomic():
-                user = User.objects.create_user(
-                    phone_number=phone_number,
-                    first_name=first_name,
-                    last_name=last_name
+            result = SignupService.signup(phone_number, first_name, last_name)
+
+            if not result['success']:
+                return Response(
+                    {"error": result['error']},
+                    status=status.HTTP_409_CONFLICT
                 )
 
-                refresh = RefreshToken.for_user(user)
+            refresh = result['refresh']
 
-                response = Response(
-                    {"access": str(refresh.access_token)},
-                    status=status.HTTP_201_CREATED
-                )
+            response = Response(
+                {"access": str(refresh.access_token)},
+                status=status.HTTP_201_CREATED
+            )
 
-                response.set_cookie(
-                    key='refresh_token',
-                    value=str(refresh),
-                    httponly=True,
-                    secure=not settings.DEBUG,
-                    samesite='Lax',
-                    max_age=int(
-                        settings.SIMPLE_JWT['REFRESH_TOKEN_LIFETIME'].total_seconds()
-                    )
+            response.set_cookie(
+                key='refresh_token',
+                value=str(refresh),
+                httponly=True,
+                secure=not settings.DEBUG,
+                samesite='Lax',
+                max_age=int(
+                    settings.SIMPLE_JWT['REFRESH_TOKEN_LIFETIME'].total_seconds()
                 )
+            )
 
-                return response
+            return response
 
         except Exception as e:
             logger.exception(
@@ -203,9 +204,17 @@ class RefreshTokenView(APIView):
             )
 
         try:
-            refresh = RefreshToken(refresh_token)
-            refresh.set_jti()
-            refresh.set_exp()
+            result = TokenService.rotate(refresh_token)
+
+            if not result['success']:
+                response = Response(
+                    {"error": result['error']},
+                    status=status.HTTP_401_UNAUTHORIZED
+                )
+                response.delete_cookie('refresh_token')
+                return response
+
+            refresh = result['refresh']
             access_token = str(refresh.access_token)
 
             response = Response(
@@ -226,14 +235,6 @@ class RefreshTokenView(APIView):
 
             return response
 
-        except TokenError:
-            response = Response(
-                {"error": _("Invalid or Expired authentication token")},
-                status=status.HTTP_401_UNAUTHORIZED
-            )
-            response.delete_cookie('refresh_token')
-            return response
-
         except Exception as e:
             logger.exception(
                 _("Token refresh failed"),
@@ -259,11 +260,8 @@ class LogoutView(APIView):
             refresh_token = request.COOKIES.get('refresh_token')
 
             if refresh_token:
-                token = RefreshToken(refresh_token)
-                token.blacklist()
+                TokenService.revoke(refresh_token)
 
-        except TokenError:
-            pass
         except Exception as e:
             logger.warning(
                 _("Logout attempted but blacklist failed"),
@@ -277,3 +275,37 @@ class LogoutView(APIView):
         response = Response(status=status.HTTP_204_NO_CONTENT)
         response.delete_cookie('refresh_token')
         return response
+
+
+class SMSProviderStatusView(APIView):
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        return Response(get_sms_provider().get_stats(), status=status.HTTP_200_OK)
+
+
+class AuthCacheStatusView(APIView):
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        return Response(
+            {
+                'users': UserCache.local().get_stats(),
+                'tokens': TokenCache.local().get_stats(),
+                'revocations': get_revocation_store().get_stats(),
+            },
+            status=status.HTTP_200_OK
+        )
+
+
+class JWKSView(APIView):
+    permission_classes = [AllowAny]
+    authentication_classes = []
+
+    def get(self, request):
+        # The key set only changes on restart, so it is served as pre-encoded bytes
+        jwks_json = getattr(get_token_backend(), 'jwks_json', b'{"keys":[]}')
+
+        response = HttpResponse(jwks_json, content_type='application/json')
+        patch_cache_control(response, public=True, max_age=settings.JWKS_CACHE_SECONDS)
+        return response
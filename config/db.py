@@ -0,0 +1,95 @@
+import random
+import time
+from urllib.parse import parse_qsl, unquote, urlparse
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db import DEFAULT_DB_ALIAS, OperationalError, connections, transaction
+
+ENGINES = {
+    'sqlite': 'django.db.backends.sqlite3',
+    'postgres': 'django.db.backends.postgresql',
+    'postgresql': 'django.db.backends.postgresql',
+    'pgsql': 'django.db.backends.postgresql',
+    'mysql': 'django.db.backends.mysql',
+}
+
+
+def parse_database_url(url):
+    parsed = urlparse(url)
+    engine = ENGINES.get(parsed.scheme)
+
+    if engine is None:
+        raise ImproperlyConfigured(f'Unsupported DATABASE_URL scheme: {parsed.scheme!r}')
+
+    if parsed.scheme == 'sqlite':
+        # sqlite:///relative.db and sqlite:////absolute/path.db
+        return {
+            'ENGINE': engine,
+            'NAME': unquote(parsed.path[1:]) or ':memory:',
+            'OPTIONS': {'transaction_mode': 'IMMEDIATE'},
+        }
+
+    return {
+        'ENGINE': engine,
+        'NAME': unquote(parsed.path[1:]),
+        'USER': unquote(parsed.username or ''),
+        'PASSWORD': unquote(parsed.password or ''),
+        'HOST': parsed.hostname or '',
+        'PORT': str(parsed.port or ''),
+        'OPTIONS': dict(parse_qsl(parsed.query)),
+    }
+
+
+def parse_database_aliases(value, test_mirror=None):
+    databases = {}
+
+    for entry in filter(None, (item.strip() for item in value.split(','))):
+        alias, separator, url = entry.partition('=')
+
+        if not separator:
+            raise ImproperlyConfigured(f'Database entries must look like alias=url, got {entry!r}')
+
+        database = parse_database_url(url.strip())
+        if test_mirror:
+            database['TEST'] = {'MIRROR': test_mirror}
+        databases[alias.strip()] = database
+
+    return databases
+
+
+LOCK_ERROR_MESSAGES = ('database is locked', 'database table is locked')
+
+
+def sqlite_pragma_statements():
+    return [f'PRAGMA {name} = {value}' for name, value in settings.SQLITE_PRAGMAS.items()]
+
+
+def apply_sqlite_pragmas(sender, connection, **kwargs):
+    if connection.vendor != 'sqlite':
+        return
+
+    with connection.cursor() as cursor:
+        for statement in sqlite_pragma_statements():
+            cursor.execute(statement)
+
+
+def is_lock_error(error):
+    return isinstance(error, OperationalError) and any(message in str(error) for message in LOCK_ERROR_MESSAGES)
+
+
+def run_in_write_transaction(func, *args, using=None, **kwargs):
+    connection = connections[using or DEFAULT_DB_ALIAS]
+
+    # A retry has to replay the whole transaction, which is only possible
+    # when this call opens it; inside an outer block the caller owns retries
+    attempts = 1 if connection.in_atomic_block else settings.DB_WRITE_RETRIES + 1
+
+    for attempt in range(attempts):
+        try:
+            with transaction.atomic(using=using):
+                return func(*args, **kwargs)
+        except OperationalError as e:
+            if attempt == attempts - 1 or not is_lock_error(e):
+                raise
+
+            time.sleep(settings.DB_WRITE_RETRY_BACKOFF_SECONDS * 2 ** attempt * random.uniform(0.5, 1.5))
@@ -1,4 +1,6 @@
+from django.conf import settings
 from django.utils import translation
+from config import routers, sharding
 
 class ForceDefaultLanguageMiddleware:
     def __init__(self, get_response):
@@ -9,3 +11,50 @@ class ForceDefaultLanguageMiddleware:
         request.LANGUAGE_CODE = 'fa'
         response = self.get_response(request)
         return response
+
+
+class ReplicaRoutingMiddleware:
+    SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not settings.DATABASE_REPLICAS:
+            return self.get_response(request)
+
+        if request.method not in self.SAFE_METHODS:
+            response = self.get_response(request)
+            self.pin_after_write(request, response)
+            return response
+
+        pool = routers.get_replica_pool()
+        replica = pool.acquire()
+        routers.begin_request(replica)
+        routers.bind_request(request)
+
+        try:
+            return self.get_response(request)
+        finally:
+            routers.end_request()
+            pool.release(replica)
+
+    def pin_after_write(self, request, response):
+        if response.status_code >= 400:
+            return
+
+        user = getattr(request, 'user', None)
+        if user is not None and user.is_authenticated:
+            routers.pin_to_primary(user.pk)
+
+
+class ShardRoutingMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        # Authentication activates the user's shard; it must not outlive the request
+        try:
+            return self.get_response(request)
+        finally:
+            sharding.deactivate()
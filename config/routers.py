@@ -0,0 +1,176 @@
+import itertools
+import threading
+from django.conf import settings
+from django.core.cache import caches
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.utils.functional import SimpleLazyObject
+from config import sharding
+
+_state = threading.local()
+
+
+class ReplicaPool:
+    def __init__(self, aliases, strategy):
+        self.aliases = list(aliases)
+        self.strategy = strategy
+        self.in_flight = dict.fromkeys(self.aliases, 0)
+        self._cycle = itertools.cycle(self.aliases)
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        with self._lock:
+            if self.strategy == 'least_loaded':
+                # Ties are broken by the rotation so idle replicas still share load
+                start = next(self._cycle)
+                offset = self.aliases.index(start)
+                ordered = self.aliases[offset:] + self.aliases[:offset]
+                alias = min(ordered, key=lambda name: self.in_flight[name])
+            else:
+                alias = next(self._cycle)
+
+            self.in_flight[alias] += 1
+            return alias
+
+    def release(self, alias):
+        with self._lock:
+            self.in_flight[alias] -= 1
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_replica_pool():
+    global _pool
+
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ReplicaPool(settings.DATABASE_REPLICAS, settings.DATABASE_REPLICA_STRATEGY)
+
+    return _pool
+
+
+def pin_key(user_id):
+    return f'db:pin:{user_id}'
+
+
+def pin_to_primary(user_id):
+    if settings.DATABASE_REPLICAS and user_id is not None:
+        caches['default'].set(pin_key(user_id), 1, timeout=settings.DATABASE_READ_PIN_SECONDS)
+
+
+def begin_request(replica):
+    _state.replica = replica
+    _state.request = None
+    _state.pinned = None
+
+
+def bind_request(request):
+    _state.request = request
+
+
+def end_request():
+    _state.replica = None
+    _state.request = None
+    _state.pinned = None
+
+
+def _resolved_user(request):
+    # Only a user that is already loaded may be consulted: forcing the
+    # middleware's lazy user reads the session, and that read is routed back
+    # here. DRF replaces the lazy object with the user it authenticated.
+    user = request.__dict__.get('user')
+    if isinstance(user, SimpleLazyObject):
+        return request.__dict__.get('_cached_user')
+    return user
+
+
+def _is_pinned():
+    if _state.pinned is not None:
+        return _state.pinned
+
+    user = _resolved_user(_state.request) if _state.request is not None else None
+    if user is None or not getattr(user, 'is_authenticated', False):
+        return False
+
+    _state.pinned = caches['default'].get(pin_key(user.pk)) is not None
+    return _state.pinned
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        replica = getattr(_state, 'replica', None)
+
+        if replica is None:
+            return None
+
+        # Reads inside a transaction must see its own uncommitted writes
+        if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+
+        if _is_pinned():
+            return DEFAULT_DB_ALIAS
+
+        return replica
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {DEFAULT_DB_ALIAS, *settings.DATABASE_REPLICAS}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+
+class ShardRouter:
+    def _model_label(self, model):
+        # Auto-created many-to-many tables live next to the model that declares them
+        opts = model._meta
+        if opts.auto_created:
+            opts = opts.auto_created._meta
+        return opts.label_lower
+
+    def _shard_for(self, model, hints):
+        key_field = settings.SHARDED_MODELS.get(self._model_label(model))
+
+        if key_field is None:
+            return None
+
+        instance = hints.get('instance')
+        if instance is not None and isinstance(instance, model):
+            if instance._state.db:
+                return instance._state.db
+
+            key = getattr(instance, key_field, None)
+            if key is not None:
+                return sharding.shard_for_key(key)
+
+        shard = sharding.active_shard()
+        if shard is None:
+            raise sharding.ShardNotSelected(
+                f'No shard is active for {model._meta.label}; '
+                'use config.sharding.use_shard() or route by instance'
+            )
+        return shard
+
+    def db_for_read(self, model, **hints):
+        if not sharding.is_enabled():
+            return None
+        return self._shard_for(model, hints)
+
+    def db_for_write(self, model, **hints):
+        if not sharding.is_enabled():
+            return None
+        return self._shard_for(model, hints)
+
+    def allow_relation(self, obj1, obj2, **hints):
+        if not sharding.is_enabled():
+            return None
+
+        # Catalog rows are mirrored onto every shard, so they relate to anything
+        mirrored = settings.MIRRORED_MODELS
+        if obj1._meta.label_lower in mirrored or obj2._meta.label_lower in mirrored:
+            return True
+        return None
@@ -3,6 +3,7 @@ from pathlib import Path
 from datetime import timedelta
 from dotenv import load_dotenv
 
+from config.db import parse_database_aliases
 from config.logging_config import LOGGING
 
 BASE_DIR = Path(__file__).resolve().parent.parent.parent
@@ -27,6 +28,8 @@ INSTALLED_APPS = [
     'django.contrib.staticfiles',
     'rest_framework',
     'rest_framework_simplejwt',
+    # Kept until authentication 0007 has copied blacklisted JTIs into revoked_tokens
+    # on every environment; the app's own per-token bookkeeping is bypassed
     'rest_framework_simplejwt.token_blacklist',
     'corsheaders',
     'authentication',
@@ -36,12 +39,14 @@ INSTALLED_APPS = [
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
+    'config.middleware.ShardRoutingMiddleware',
     'django.middleware.locale.LocaleMiddleware',
     'config.middleware.ForceDefaultLanguageMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'config.middleware.ReplicaRoutingMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -70,9 +75,54 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        # Writers take the lock at BEGIN, so busy_timeout can queue them instead
+        # of failing a read-to-write upgrade with "database is locked"
+        'OPTIONS': {'transaction_mode': 'IMMEDIATE'},
+        # Threaded tests need a file so WAL and busy_timeout apply; the shared
+        # in-memory test database fails contended table locks immediately
+        'TEST': {'NAME': BASE_DIR / 'test_db.sqlite3'},
     }
 }
 
+# Read replicas as "alias=url" pairs, e.g. replica1=sqlite:///replica.sqlite3.
+# Safe-method requests read from them; everything else stays on default. Test
+# runs read them through default so fixtures written there are visible
+DATABASE_REPLICAS = parse_database_aliases(os.environ.get('DATABASE_REPLICAS', ''), test_mirror='default')
+DATABASES.update(DATABASE_REPLICAS)
+DATABASE_REPLICA_STRATEGY = os.environ.get('DATABASE_REPLICA_STRATEGY', 'round_robin')
+# How long a user's reads stay on default after they write (read-your-writes)
+DATABASE_READ_PIN_SECONDS = int(os.environ.get('DATABASE_READ_PIN_SECONDS', 5))
+
+# Horizontal sharding is opt-in: DATABASE_SHARDS="alias=url,..." spreads users
+# over those databases by a jump hash of the user id (config.sharding), while
+# default keeps the global tables and the phone/username directory. Sharded
+# models map to the field that selects their shard; without an instance the
+# shard activated for the request is used.
+DATABASE_SHARDS = parse_database_aliases(os.environ.get('DATABASE_SHARDS', ''))
+DATABASES.update(DATABASE_SHARDS)
+SHARDED_MODELS = {
+    'authentication.user': 'pk',
+    'authentication.tokenfamily': 'user_id',
+    'authentication.otp': 'phone_number',
+    'admin.logentry': 'user_id',
+    'profiles.profile': 'user_id',
+}
+# Written to default and copied onto every shard by profiles.signals
+MIRRORED_MODELS = ['profiles.interest']
+DATABASE_ROUTERS = ['config.routers.ShardRouter', 'config.routers.ReplicaRouter']
+
+# Applied by config.db.apply_sqlite_pragmas on every new SQLite connection
+SQLITE_PRAGMAS = {
+    'journal_mode': os.environ.get('SQLITE_JOURNAL_MODE', 'WAL'),
+    'synchronous': os.environ.get('SQLITE_SYNCHRONOUS', 'NORMAL'),
+    'busy_timeout': int(os.environ.get('SQLITE_BUSY_TIMEOUT_MS', 5000)),
+    'mmap_size': int(os.environ.get('SQLITE_MMAP_SIZE', 128 * 1024 * 1024)),
+    'cache_size': int(os.environ.get('SQLITE_CACHE_SIZE', -20000)),
+}
+
+DB_WRITE_RETRIES = 3
+DB_WRITE_RETRY_BACKOFF_SECONDS = 0.05
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
@@ -97,7 +147,7 @@ AUTHENTICATION_BACKENDS = [
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'authentication.authentication.CachedJWTAuthentication',
     ),
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.IsAuthenticated',
@@ -108,20 +158,111 @@ SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(minutes=60),
     'REFRESH_TOKEN_LIFETIME': timedelta(days=7),
     'ROTATE_REFRESH_TOKENS': True,
-    'BLACKLIST_AFTER_ROTATION': True,
-    'UPDATE_LAST_LOGIN': True,
+    # Rotation revokes the old token through authentication.revocation
+    'BLACKLIST_AFTER_ROTATION': False,
+    # last_login is buffered and written in batches by authentication.last_login
+    'UPDATE_LAST_LOGIN': False,
     'ALGORITHM': 'HS256',
     'SIGNING_KEY': SECRET_KEY,
     'AUTH_HEADER_TYPES': ('Bearer',),
     'AUTH_HEADER_NAME': 'HTTP_AUTHORIZATION',
     'USER_ID_FIELD': 'id',
     'USER_ID_CLAIM': 'user_id',
-    'AUTH_TOKEN_CLASSES': ('rest_framework_simplejwt.tokens.AccessToken',),
+    'AUTH_TOKEN_CLASSES': ('authentication.tokens.AccessToken',),
     'TOKEN_TYPE_CLAIM': 'token_type',
 }
 
+# Asymmetric signing is opt-in; with HS256 and no keys the SIMPLE_JWT backend is
+# used as is. JWT_KEYS is "kid=path.pem,...": the first key signs, the others are
+# retired keys kept for verification. Publish a new key as a later entry for at
+# least JWKS_CACHE_SECONDS before moving it to the front. After switching away
+# from HS256, JWT_LEGACY_TOKENS_UNTIL (ISO 8601) keeps old HS256 tokens valid;
+# set it to the switch time plus REFRESH_TOKEN_LIFETIME, or leave it empty.
+JWT_SIGNING = {
+    'ALGORITHM': os.environ.get('JWT_ALGORITHM', SIMPLE_JWT['ALGORITHM']),
+    'KEYS': [
+        tuple(item.strip().split('=', 1))
+        for item in os.environ.get('JWT_KEYS', '').split(',') if item.strip()
+    ],
+    'LEGACY_TOKENS_UNTIL': os.environ.get('JWT_LEGACY_TOKENS_UNTIL', ''),
+}
+JWKS_CACHE_SECONDS = int(os.environ.get('JWKS_CACHE_SECONDS', 86400))
+
+# Revoked refresh-token JTIs live in the shared cache until the token expires,
+# backed by the revoked_tokens table. Each process keeps a Bloom filter of them
+# and re-syncs it at most every BLOOM_REFRESH_SECONDS, so a revocation made in
+# another process can take that long to be seen.
+TOKEN_REVOCATION = {
+    'CACHE_ALIAS': 'default',
+    'BLOOM_REFRESH_SECONDS': int(os.environ.get('TOKEN_REVOCATION_REFRESH_SECONDS', 5)),
+    'BLOOM_REBUILD_SECONDS': 3600,
+    'BLOOM_FALSE_POSITIVE_RATE': 0.01,
+    'BLOOM_MIN_CAPACITY': 10000,
+}
+
+# Per-process entries are short-lived because only the shared cache is
+# invalidated across workers; bulk update() calls bypass the signals entirely
+AUTH_USER_CACHE = {
+    'CACHE_ALIAS': 'default',
+    'LOCAL_MAXSIZE': int(os.environ.get('AUTH_USER_CACHE_LOCAL_MAXSIZE', 10000)),
+    'LOCAL_TTL_SECONDS': int(os.environ.get('AUTH_USER_CACHE_LOCAL_TTL_SECONDS', 5)),
+    'SHARED_TTL_SECONDS': int(os.environ.get('AUTH_USER_CACHE_SHARED_TTL_SECONDS', 300)),
+}
+
+# Profile ETags combine Profile.updated_at with the interest catalog version
+# kept in this cache. Rendered public profiles are cached per username and
+# invalidated by profiles.signals; the TTL only bounds missed invalidations
+PROFILE_CACHE = {
+    'CACHE_ALIAS': 'default',
+    'PUBLIC_TTL_SECONDS': int(os.environ.get('PUBLIC_PROFILE_CACHE_TTL_SECONDS', 300)),
+    'LOCK_SECONDS': 5,
+    'LOCK_WAIT_SECONDS': 2,
+}
+
+# Profile listings page with a keyset cursor; clients may ask for up to MAX_PAGE_SIZE rows
+PROFILE_PAGINATION = {
+    'PAGE_SIZE': int(os.environ.get('PROFILE_PAGE_SIZE', 20)),
+    'MAX_PAGE_SIZE': int(os.environ.get('PROFILE_MAX_PAGE_SIZE', 100)),
+}
+
+# Validated access-token claims are kept per process until the token's exp.
+# Revoking a refresh token or a token family does not cut short access tokens
+# already issued from it; they stay valid for up to ACCESS_TOKEN_LIFETIME.
+AUTH_TOKEN_CACHE = {
+    'MAXSIZE': int(os.environ.get('AUTH_TOKEN_CACHE_MAXSIZE', 10000)),
+}
+
+# The admin shows last_login within FLUSH_INTERVAL + MIN_INTERVAL of the real value
+LAST_LOGIN_FLUSH_INTERVAL_SECONDS = int(os.environ.get('LAST_LOGIN_FLUSH_INTERVAL_SECONDS', 30))
+LAST_LOGIN_MIN_INTERVAL_SECONDS = int(os.environ.get('LAST_LOGIN_MIN_INTERVAL_SECONDS', 60))
+LAST_LOGIN_BATCH_SIZE = 500
+
 OTP_EXPIRY_MINUTES = 2
 OTP_RATE_LIMIT_MINUTES = 2
+OTP_RATE_LIMIT_CACHE_ALIAS = 'default'
+OTP_RATE_LIMITS = {
+    'request_otp': {
+        'phone': '3/10m',
+        'ip': '15/10m',
+        'subnet': '60/10m',
+        'global': '1000/1m',
+    },
+    'verify_otp': {
+        'phone': '5/10m',
+        'ip': '30/10m',
+        'subnet': '120/10m',
+        'global': '3000/1m',
+    },
+}
+OTP_HMAC_SECRET = os.environ.get('OTP_HMAC_SECRET', SECRET_KEY)
+# Keep the step no shorter than the rate-limit window so a reissued code always differs
+OTP_STATELESS_STEP_SECONDS = OTP_RATE_LIMIT_MINUTES * 60
+OTP_STORE = {
+    'BACKEND': os.environ.get('OTP_STORE_BACKEND', 'authentication.otp_store.DatabaseOTPStore'),
+    'OPTIONS': {
+        'cache_alias': os.environ.get('OTP_STORE_CACHE_ALIAS', 'default'),
+    },
+}
 SIGNUP_TOKEN_EXPIRY_MINUTES = 10
 
 LANGUAGE_CODE = 'fa'
@@ -150,5 +291,44 @@ SMSIR_API_KEY = os.environ.get('SMSIR_API_KEY', '')
 SMSIR_LINE_NUMBER = os.environ.get('SMSIR_LINE_NUMBER', '')
 SMSIR_TEMPLATE_ID = os.environ.get('SMSIR_TEMPLATE_ID', '')
 SMSIR_BASE_URL = os.environ.get('SMSIR_BASE_URL', '')
+SMSIR_CONNECT_TIMEOUT_SECONDS = 3
+SMSIR_READ_TIMEOUT_SECONDS = 10
+SMSIR_POOL_MAXSIZE = int(os.environ.get('SMSIR_POOL_MAXSIZE', 10))
+SMSIR_MAX_RETRIES = 2
+SMSIR_RETRY_BACKOFF_SECONDS = 0.5
+SMSIR_CIRCUIT_FAILURE_THRESHOLD = 5
+SMSIR_CIRCUIT_RECOVERY_SECONDS = 30
+
+SMS_BACKEND_DEFINITIONS = {
+    'smsir': {
+        'BACKEND': 'authentication.sms_backends.SMSIRBackend',
+    },
+    'console': {
+        'BACKEND': 'authentication.sms_backends.ConsoleSMSBackend',
+        'OPTIONS': {'file_path': os.environ.get('SMS_CONSOLE_FILE', '')},
+    },
+    'locmem': {
+        'BACKEND': 'authentication.sms_backends.LocMemSMSBackend',
+    },
+}
+SMS_BACKENDS = [name.strip() for name in os.environ.get('SMS_BACKENDS', 'smsir').split(',') if name.strip()]
+SMS_FAILOVER = {
+    'WINDOW_SIZE': 20,
+    'MIN_SAMPLES': 5,
+    'MAX_ERROR_RATE': 0.5,
+    'MAX_LATENCY_MS': 3000,
+    'COOLDOWN_SECONDS': 60,
+}
+SMS_DELIVERY_MODE = os.environ.get('SMS_DELIVERY_MODE', 'outbox')
+SMS_OUTBOX_WORKERS = int(os.environ.get('SMS_OUTBOX_WORKERS', 4))
+SMS_OUTBOX_BATCH_SIZE = 50
+SMS_OUTBOX_POLL_INTERVAL_SECONDS = 1
+SMS_OUTBOX_MAX_ATTEMPTS = 5
+SMS_OUTBOX_RETRY_BASE_SECONDS = 2
+SMS_OUTBOX_LOCK_TIMEOUT_SECONDS = 60
+SMS_OUTBOX_RETENTION_DAYS = 7
+
+PURGE_BATCH_SIZE = 1000
+PURGE_BATCH_SLEEP_SECONDS = 0.05
 
 CORS_ALLOW_CREDENTIALS = True
@@ -1 +1,74 @@
+from copy import deepcopy
+from config.db import parse_database_url
 from .base import *
+
+DEBUG = False
+
+ALLOWED_HOSTS = [host.strip() for host in os.environ.get('ALLOWED_HOSTS', '').split(',') if host.strip()]
+CSRF_TRUSTED_ORIGINS = [origin.strip() for origin in os.environ.get('CSRF_TRUSTED_ORIGINS', '').split(',') if origin.strip()]
+CORS_ALLOWED_ORIGINS = [origin.strip() for origin in os.environ.get('CORS_ALLOWED_ORIGINS', '').split(',') if origin.strip()]
+
+SECURE_PROXY_SSL_HEADER = ('HTTP_X_FORWARDED_PROTO', 'https')
+SECURE_SSL_REDIRECT = os.environ.get('SECURE_SSL_REDIRECT', 'False') == 'True'
+SECURE_HSTS_SECONDS = int(os.environ.get('SECURE_HSTS_SECONDS', 0))
+SESSION_COOKIE_SECURE = True
+CSRF_COOKIE_SECURE = True
+X_FRAME_OPTIONS = 'DENY'
+
+DATABASES = {
+    'default': parse_database_url(os.environ.get('DATABASE_URL', f'sqlite:///{BASE_DIR / "db.sqlite3"}')),
+    **DATABASE_REPLICAS,
+    **DATABASE_SHARDS,
+}
+
+# Backends with a driver-level pool (PostgreSQL on psycopg 3) hand connections
+# back to the pool per request; everything else keeps them open between requests
+for database in DATABASES.values():
+    if database['ENGINE'] == 'django.db.backends.postgresql' and os.environ.get('DB_POOL', 'False') == 'True':
+        database['OPTIONS']['pool'] = {
+            'min_size': int(os.environ.get('DB_POOL_MIN_SIZE', 2)),
+            'max_size': int(os.environ.get('DB_POOL_MAX_SIZE', 10)),
+            'timeout': int(os.environ.get('DB_POOL_TIMEOUT_SECONDS', 10)),
+        }
+        database['CONN_MAX_AGE'] = 0
+    else:
+        database['CONN_MAX_AGE'] = int(os.environ.get('DB_CONN_MAX_AGE', 60))
+
+    database['CONN_HEALTH_CHECKS'] = True
+
+# Rate limits, OTP slots, revocations and the auth caches rely on a cache that
+# every worker shares, so the per-process LocMemCache default is never used here
+REDIS_URL = os.environ.get('REDIS_URL', '')
+
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+            'KEY_PREFIX': 'meeta',
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+            'LOCATION': 'django_cache',
+            'KEY_PREFIX': 'meeta',
+        }
+    }
+
+TEMPLATES[0]['APP_DIRS'] = False
+TEMPLATES[0]['OPTIONS']['loaders'] = [
+    ('django.template.loaders.cached.Loader', [
+        'django.template.loaders.filesystem.Loader',
+        'django.template.loaders.app_directories.Loader',
+    ]),
+]
+
+LOG_LEVEL = os.environ.get('LOG_LEVEL', 'INFO')
+
+LOGGING = deepcopy(LOGGING)
+for logger_name in ('profiles', 'authentication', 'payments', 'common'):
+    LOGGING['loggers'][logger_name]['level'] = LOG_LEVEL
+LOGGING['loggers']['django']['level'] = 'WARNING'
+LOGGING['root']['level'] = 'WARNING'
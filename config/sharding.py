@@ -0,0 +1,126 @@
+import hashlib
+import heapq
+import threading
+from contextlib import contextmanager
+from itertools import islice
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+
+_state = threading.local()
+
+
+class ShardNotSelected(RuntimeError):
+    pass
+
+
+def is_enabled():
+    return bool(settings.DATABASE_SHARDS)
+
+
+def shard_aliases():
+    return list(settings.DATABASE_SHARDS) or [DEFAULT_DB_ALIAS]
+
+
+def jump_hash(key, buckets):
+    # Lamping & Veach jump consistent hash: growing from N to N+1 shards
+    # moves only about 1/(N+1) of the keys
+    bucket, candidate = -1, 0
+
+    while candidate < buckets:
+        bucket = candidate
+        key = (key * 2862933555777941757 + 1) & 0xFFFFFFFFFFFFFFFF
+        candidate = int((bucket + 1) * ((1 << 31) / ((key >> 33) + 1)))
+
+    return bucket
+
+
+def shard_for_key(key):
+    shards = list(settings.DATABASE_SHARDS)
+
+    if not shards:
+        return DEFAULT_DB_ALIAS
+
+    digest = hashlib.blake2b(str(key).encode(), digest_size=8).digest()
+    return shards[jump_hash(int.from_bytes(digest, 'big'), len(shards))]
+
+
+def group_by_shard(items, key=None):
+    groups = {}
+
+    for item in items:
+        groups.setdefault(shard_for_key(item if key is None else key(item)), []).append(item)
+
+    return groups
+
+
+def active_shard():
+    return getattr(_state, 'shard', None)
+
+
+def activate(alias):
+    _state.shard = alias
+
+
+def deactivate():
+    _state.shard = None
+
+
+@contextmanager
+def use_shard(alias):
+    previous = active_shard()
+    activate(alias)
+
+    try:
+        yield alias
+    finally:
+        activate(previous)
+
+
+def querysets_for(queryset):
+    # One queryset per shard for sharded models, the queryset itself otherwise
+    if not is_enabled() or queryset.model._meta.label_lower not in settings.SHARDED_MODELS:
+        return [queryset]
+
+    return [queryset.using(alias) for alias in shard_aliases()]
+
+
+class ScatterGather:
+    ordered = True
+
+    def __init__(self, queryset, key, descending=False):
+        self.queryset = queryset
+        self.key = key
+        self.descending = descending
+
+    def filter(self, *args, **kwargs):
+        return ScatterGather(self.queryset.filter(*args, **kwargs), self.key, self.descending)
+
+    def reverse(self):
+        return ScatterGather(self.queryset.reverse(), self.key, not self.descending)
+
+    def count(self):
+        return sum(self.queryset.using(alias).count() for alias in shard_aliases())
+
+    def __len__(self):
+        return self.count()
+
+    def _merge(self, limit):
+        # Every shard returns its rows in the same order, so its first `limit`
+        # rows are enough to build the first `limit` rows of the merged result
+        parts = [
+            list(self.queryset.using(alias)[:limit] if limit is not None else self.queryset.using(alias))
+            for alias in shard_aliases()
+        ]
+        return heapq.merge(*parts, key=self.key, reverse=self.descending)
+
+    def __iter__(self):
+        return iter(self._merge(None))
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            if index.step is not None:
+                raise ValueError('ScatterGather does not support slice steps')
+            start = index.start or 0
+            return list(islice(self._merge(index.stop), start, index.stop))
+
+        return list(islice(self._merge(index + 1), index, index + 1))[0]
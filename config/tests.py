@@ -0,0 +1,37 @@
+from types import SimpleNamespace
+from django.core.cache import caches
+from django.test import RequestFactory, SimpleTestCase
+from django.utils.functional import SimpleLazyObject
+from config import routers
+
+
+class ReplicaPinTests(SimpleTestCase):
+    USER = SimpleNamespace(pk=7, is_authenticated=True)
+
+    def setUp(self):
+        caches['default'].set(routers.pin_key(self.USER.pk), 1)
+        self.addCleanup(caches['default'].delete, routers.pin_key(self.USER.pk))
+        self.addCleanup(routers.end_request)
+
+        self.request = RequestFactory().get('/')
+        routers.begin_request('replica')
+        routers.bind_request(self.request)
+
+    def unresolved_user(self):
+        self.fail("The router evaluated the lazy request user")
+
+    def test_lazy_user_is_not_evaluated(self):
+        self.request.user = SimpleLazyObject(self.unresolved_user)
+
+        self.assertFalse(routers._is_pinned())
+
+    def test_cached_user_is_consulted(self):
+        self.request.user = SimpleLazyObject(self.unresolved_user)
+        self.request._cached_user = self.USER
+
+        self.assertTrue(routers._is_pinned())
+
+    def test_user_set_by_authentication_is_consulted(self):
+        self.request.user = self.USER
+
+        self.assertTrue(routers._is_pinned())
@@ -4,6 +4,7 @@ from django.conf.urls.i18n import i18n_patterns
 from django.conf import settings
 from django.conf.urls.static import static
 from django.utils import translation
+from authentication.views import JWKSView
 
 translation.activate('fa')
 
@@ -16,6 +17,7 @@ urlpatterns += i18n_patterns(
 )
 
 urlpatterns += [
+    path('.well-known/jwks.json', JWKSView.as_view(), name='jwks'),
     path('api/v1/auth/', include('authentication.urls')),
     path('api/v1/profiles/', include('profiles.urls')),
 ]
@@ -0,0 +1,195 @@
+import hashlib
+import threading
+import time
+from types import MappingProxyType
+from django.conf import settings
+from django.core.cache import caches
+from django.db import router
+from django.utils.http import quote_etag
+from rest_framework.renderers import JSONRenderer
+from .models import Interest
+
+
+class InterestCatalogVersion:
+    KEY = 'interests:version'
+
+    @staticmethod
+    def cache():
+        return caches[settings.PROFILE_CACHE['CACHE_ALIAS']]
+
+    @staticmethod
+    def get():
+        # Microseconds since the epoch of the last catalog change, so the
+        # version doubles as the catalog's Last-Modified time
+        version = InterestCatalogVersion.cache().get(InterestCatalogVersion.KEY)
+
+        if version is None:
+            InterestCatalogVersion.cache().add(InterestCatalogVersion.KEY, time.time_ns() // 1000, timeout=None)
+            version = InterestCatalogVersion.cache().get(InterestCatalogVersion.KEY)
+
+        return version
+
+    @staticmethod
+    def bump():
+        cache = InterestCatalogVersion.cache()
+        version = max(time.time_ns() // 1000, (cache.get(InterestCatalogVersion.KEY) or 0) + 1)
+        cache.set(InterestCatalogVersion.KEY, version, timeout=None)
+        return version
+
+
+class InterestSnapshot:
+    __slots__ = ('version', 'by_id', 'by_slug', 'data', 'content', 'etag', 'last_modified')
+
+    def __init__(self, version, interests):
+        from .serializers import InterestSerializer
+
+        self.version = version
+        self.by_id = MappingProxyType({interest.pk: interest for interest in interests})
+        self.by_slug = MappingProxyType({interest.slug: interest for interest in interests})
+        self.data = tuple(InterestSerializer(interests, many=True).data)
+        self.content = JSONRenderer().render(self.data)
+        self.etag = quote_etag(f'interests-{version}')
+        self.last_modified = version // 1_000_000
+
+
+class InterestCatalog:
+    _snapshot = None
+    _lock = threading.Lock()
+
+    @staticmethod
+    def get():
+        # One shared-cache read per call decides whether this process's copy
+        # is current; the table is only read after the version moves
+        version = InterestCatalogVersion.get()
+        snapshot = InterestCatalog._snapshot
+
+        if snapshot is not None and snapshot.version == version:
+            return snapshot
+
+        with InterestCatalog._lock:
+            snapshot = InterestCatalog._snapshot
+
+            if snapshot is None or snapshot.version != version:
+                # Read from the primary: a lagging replica would pin stale
+                # rows to the new version until the next change
+                interests = list(Interest.objects.using(router.db_for_write(Interest)).order_by('name'))
+                snapshot = InterestSnapshot(version, interests)
+                InterestCatalog._snapshot = snapshot
+
+        return snapshot
+
+    @staticmethod
+    def reset():
+        with InterestCatalog._lock:
+            InterestCatalog._snapshot = None
+
+
+def profile_validators(profile_id, updated_at, *extra):
+    version = InterestCatalogVersion.get()
+    source = ':'.join(str(part) for part in (profile_id, updated_at.isoformat(), version, *extra))
+    etag = quote_etag(hashlib.blake2b(source.encode(), digest_size=16).hexdigest())
+    last_modified = int(max(updated_at.timestamp(), version / 1_000_000))
+    return etag, last_modified
+
+
+class PublicProfileCache:
+    _lock = threading.Lock()
+    hits = 0
+    misses = 0
+    waits = 0
+    renders = 0
+    stored = 0
+    stored_bytes = 0
+
+    @staticmethod
+    def cache():
+        return caches[settings.PROFILE_CACHE['CACHE_ALIAS']]
+
+    @staticmethod
+    def key(username):
+        return f'profiles:public:{username.lower()}'
+
+    @staticmethod
+    def _count(name, amount=1):
+        with PublicProfileCache._lock:
+            setattr(PublicProfileCache, name, getattr(PublicProfileCache, name) + amount)
+
+    @staticmethod
+    def _lookup(cache, key, origin):
+        return (cache.get(key) or {}).get(origin)
+
+    @staticmethod
+    def get_or_render(username, origin, render):
+        # Bodies carry absolute URLs, so each origin gets its own variant; they
+        # share the username's key so one delete invalidates all of them
+        config = settings.PROFILE_CACHE
+        cache = PublicProfileCache.cache()
+        key = PublicProfileCache.key(username)
+        entry = PublicProfileCache._lookup(cache, key, origin)
+
+        if entry is not None:
+            PublicProfileCache._count('hits')
+            return entry
+
+        PublicProfileCache._count('misses')
+        lock_key = f'{key}:{origin}:lock'
+
+        # Single flight: one worker renders a missing entry while the others
+        # wait briefly for it instead of all hitting the database at once
+        acquired = cache.add(lock_key, 1, timeout=config['LOCK_SECONDS'])
+
+        if not acquired:
+            PublicProfileCache._count('waits')
+            deadline = time.monotonic() + config['LOCK_WAIT_SECONDS']
+
+            while time.monotonic() < deadline:
+                time.sleep(0.05)
+                entry = PublicProfileCache._lookup(cache, key, origin)
+                if entry is not None:
+                    return entry
+
+        try:
+            PublicProfileCache._count('renders')
+            entry = render()
+
+            if entry is not None:
+                # A variant lost to a concurrent write is only rendered again
+                variants = cache.get(key) or {}
+                variants[origin] = entry
+                cache.set(key, variants, timeout=config['PUBLIC_TTL_SECONDS'])
+                PublicProfileCache._count('stored')
+                PublicProfileCache._count('stored_bytes', len(entry[2]))
+        finally:
+            if acquired:
+                cache.delete(lock_key)
+
+        return entry
+
+    @staticmethod
+    def invalidate(*usernames):
+        keys = [PublicProfileCache.key(username) for username in usernames if username]
+
+        if not keys:
+            return
+
+        PublicProfileCache.cache().delete_many(keys)
+
+    @staticmethod
+    def get_stats():
+        with PublicProfileCache._lock:
+            hits, misses = PublicProfileCache.hits, PublicProfileCache.misses
+            waits, renders = PublicProfileCache.waits, PublicProfileCache.renders
+            stored, stored_bytes = PublicProfileCache.stored, PublicProfileCache.stored_bytes
+
+        lookups = hits + misses
+        # The shared cache evicts and expires entries on its own, so sizes are
+        # reported per stored render rather than as a tally of what is still cached
+        return {
+            'hits': hits,
+            'misses': misses,
+            'hit_ratio': round(hits / lookups, 3) if lookups else 0.0,
+            'waits': waits,
+            'renders': renders,
+            'stored': stored,
+            'avg_entry_bytes': round(stored_bytes / stored) if stored else 0,
+        }
@@ -0,0 +1,110 @@
+import time
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from config import sharding
+from profiles.models import Interest, Profile
+from profiles.serializers import ProfileDetailSerializer
+
+User = get_user_model()
+
+BENCHMARK_PHONE_PREFIX = '0900'
+
+VARIANTS = {
+    'prefetch': lambda: Profile.objects.select_related('user').prefetch_related('interests'),
+    'aggregated': lambda: Profile.objects.with_full_details(),
+}
+
+
+def measure(fetch, iterations):
+    with CaptureQueriesContext(connection) as queries:
+        started = time.perf_counter()
+        for _i in range(iterations):
+            fetch()
+        elapsed = time.perf_counter() - started
+
+    return {
+        'us_per_op': round(elapsed / iterations * 1_000_000, 1),
+        'queries_per_op': round(len(queries) / iterations, 2),
+    }
+
+
+def detail(user_ids, page_size, iterations):
+    user_id = user_ids[0]
+
+    return {
+        variant: measure(
+            lambda: ProfileDetailSerializer(build().get(user_id=user_id)).data,
+            iterations
+        )
+        for variant, build in VARIANTS.items()
+    }
+
+
+def page(user_ids, page_size, iterations):
+    return {
+        variant: measure(
+            lambda: ProfileDetailSerializer(
+                build().filter(user_id__in=user_ids).order_by('-created_at', '-pk')[:page_size],
+                many=True
+            ).data,
+            iterations
+        )
+        for variant, build in VARIANTS.items()
+    }
+
+
+SCENARIOS = {
+    'detail': detail,
+    'page': page,
+}
+
+
+class Command(BaseCommand):
+    help = 'Compare queries and latency of profile reads with prefetched and JSON-aggregated interests'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--scenario',
+            nargs='+',
+            choices=list(SCENARIOS),
+            help='Limit the run to these scenarios',
+        )
+        parser.add_argument('--iterations', type=int, default=500, help='Reads per measurement')
+        parser.add_argument('--profiles', type=int, default=50, help='Benchmark profiles to create')
+        parser.add_argument('--interests', type=int, default=5, help='Interests attached to each profile')
+        parser.add_argument('--page-size', type=int, default=20, help='Profiles per page in the page scenario')
+
+    def handle(self, *args, **options):
+        if sharding.is_enabled():
+            raise CommandError('benchmark_profiles runs against the default database; disable DATABASE_SHARDS')
+
+        iterations = max(1, options['iterations'])
+        interest_count = min(max(0, options['interests']), Profile.MAX_INTERESTS)
+
+        # Everything runs inside a transaction that is rolled back, so the
+        # benchmark rows never outlive the run
+        with transaction.atomic():
+            interests = [
+                Interest.objects.create(name=f'benchmark-{i}', slug=f'benchmark-{i}')
+                for i in range(interest_count)
+            ]
+
+            user_ids = []
+            for i in range(max(1, options['profiles'])):
+                user = User.objects.create_user(phone_number=f'{BENCHMARK_PHONE_PREFIX}{i:07d}')
+                Profile.objects.get(user=user).interests.set(interests)
+                user_ids.append(user.id)
+
+            for name, scenario in SCENARIOS.items():
+                if options['scenario'] and name not in options['scenario']:
+                    continue
+
+                for variant, stats in scenario(user_ids, options['page_size'], iterations).items():
+                    self.stdout.write(
+                        f"{name} [{variant}]: {stats['us_per_op']} us/op, "
+                        f"{stats['queries_per_op']} queries/op"
+                    )
+
+            transaction.set_rollback(True)
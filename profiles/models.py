@@ -7,6 +7,8 @@ from django.core.exceptions import ValidationError
 from django.db.models import UniqueConstraint
 from django.db.models.functions import Lower
 from django.utils.translation import gettext_lazy as _
+from authentication import directory
+from config import sharding
 from .validators import validate_username, validate_instagram_url, validate_linkedin_url
 from .querysets import ProfileQuerySet
 
@@ -52,11 +54,34 @@ class Profile(models.Model):
 
     def clean(self):
         if self.username:
-            if Profile.objects.exclude(pk=self.pk).filter(username__iexact=self.username).exists():
+            if sharding.is_enabled():
+                taken = directory.username_taken(self.username, self.user_id)
+            else:
+                taken = Profile.objects.exclude(pk=self.pk).filter(username__iexact=self.username).exists()
+
+            if taken:
                 raise ValidationError({'username': _("This username is already taken.")})
 
     def save(self, *args, **kwargs):
         self.full_clean()
+
+        if sharding.is_enabled():
+            # Profiles share the global user id, and usernames are claimed in the
+            # directory first so two shards can never hand out the same one
+            if self.pk is None:
+                self.pk = self.user_id
+            previous_username = directory.claimed_username(self.user_id)
+            directory.claim_username(self.user_id, self.username)
+
+            try:
+                super().save(*args, **kwargs)
+            except Exception:
+                # The claim is already written on default; a failed shard write
+                # hands it back instead of leaving the username reserved
+                directory.claim_username(self.user_id, previous_username)
+                raise
+            return
+
         super().save(*args, **kwargs)
 
     def __str__(self):
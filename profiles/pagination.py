@@ -0,0 +1,106 @@
+import base64
+import binascii
+from django.conf import settings
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from django.utils.translation import gettext_lazy as _
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    ordering = ('-created_at', '-pk')
+    invalid_cursor_message = _("Invalid cursor.")
+
+    def get_page_size(self, request):
+        config = settings.PROFILE_PAGINATION
+
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return config['PAGE_SIZE']
+
+        return min(max(page_size, 1), config['MAX_PAGE_SIZE'])
+
+    def encode_cursor(self, item, reverse):
+        position = f"{int(reverse)}|{item.created_at.isoformat()}|{item.pk}"
+        cursor = base64.urlsafe_b64encode(position.encode()).decode().rstrip('=')
+        return replace_query_param(self.base_url, self.cursor_query_param, cursor)
+
+    def decode_cursor(self, request):
+        cursor = request.query_params.get(self.cursor_query_param)
+
+        if not cursor:
+            return None
+
+        try:
+            position = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+            reverse, created_at, pk = position.split('|')
+            created_at = parse_datetime(created_at)
+            pk = int(pk)
+        except (binascii.Error, UnicodeDecodeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+
+        if reverse not in ('0', '1') or created_at is None:
+            raise NotFound(self.invalid_cursor_message)
+
+        return reverse == '1', created_at, pk
+
+    def paginate_queryset(self, queryset, request, view=None):
+        # The queryset arrives ordered by `ordering`; each page seeks past the
+        # cursor's (created_at, pk) position, so no page counts rows or skips
+        # an offset and a deep page costs the same as the first one
+        self.base_url = request.build_absolute_uri()
+        page_size = self.get_page_size(request)
+        cursor = self.decode_cursor(request)
+        reverse = False
+
+        if cursor is not None:
+            reverse, created_at, pk = cursor
+
+            # One range on created_at keeps the scan on the index; rows sharing
+            # the cursor's timestamp are then cut by primary key
+            if reverse:
+                queryset = queryset.filter(
+                    Q(created_at__gte=created_at) & ~Q(created_at=created_at, pk__lte=pk)
+                ).reverse()
+            else:
+                queryset = queryset.filter(
+                    Q(created_at__lte=created_at) & ~Q(created_at=created_at, pk__gte=pk)
+                )
+
+        page = list(queryset[:page_size + 1])
+        has_more = len(page) > page_size
+        page = page[:page_size]
+
+        if reverse:
+            page.reverse()
+
+        has_next = has_more if not reverse else cursor is not None
+        has_previous = has_more if reverse else cursor is not None
+
+        self.next_link = self.encode_cursor(page[-1], False) if page and has_next else None
+        self.previous_link = self.encode_cursor(page[0], True) if page and has_previous else None
+        return page
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.next_link,
+            'previous': self.previous_link,
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
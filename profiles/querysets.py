@@ -1,12 +1,41 @@
 from django.db import models
+from django.db.models import JSONField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce, JSONObject
+
+
+class JSONGroupArray(models.Aggregate):
+    function = 'JSON_GROUP_ARRAY'
+    output_field = JSONField()
+
+    def as_postgresql(self, compiler, connection, **extra_context):
+        return super().as_sql(compiler, connection, function='JSONB_AGG', **extra_context)
+
+    def as_mysql(self, compiler, connection, **extra_context):
+        return super().as_sql(compiler, connection, function='JSON_ARRAYAGG', **extra_context)
 
 
 class ProfileQuerySet(models.QuerySet):
     def with_full_details(self):
-        return self.select_related('user').prefetch_related('interests')
-    
+        return self.select_related('user').with_interests_json()
+
     def with_public_details(self):
-        return self.prefetch_related('interests')
-    
+        return self.with_interests_json()
+
     def with_basic_details(self):
         return self.select_related('user')
+
+    def with_interests_json(self):
+        # The profile's interests come back as one JSON array column of the same
+        # statement, instead of a second prefetch query with an IN list
+        through = self.model.interests.through
+        interests = (
+            through.objects
+            .filter(profile_id=OuterRef('pk'))
+            .order_by()
+            .values('profile_id')
+            .annotate(data=JSONGroupArray(JSONObject(id='interest_id', name='interest__name', slug='interest__slug')))
+            .values('data')
+        )
+        return self.annotate(
+            interests_json=Coalesce(Subquery(interests), Value([], output_field=JSONField()))
+        )
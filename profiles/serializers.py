@@ -1,8 +1,11 @@
 import re
+from operator import itemgetter
 from django.core.exceptions import ValidationError as DjangoValidationError
 from django.contrib.auth import get_user_model
+from django.db import IntegrityError
 from django.utils.translation import gettext_lazy as _
 from rest_framework import serializers
+from .caching import InterestCatalog
 from .models import Profile, Interest
 from .utils import ImageUploadUtility
 
@@ -10,11 +13,39 @@ from .utils import ImageUploadUtility
 User = get_user_model()
 
 
+class InterestListSerializer(serializers.ListSerializer):
+    def get_attribute(self, instance):
+        # Profiles loaded with with_interests_json() already carry their
+        # interests, so the related manager is never queried for them
+        if hasattr(instance, 'interests_json'):
+            return sorted(instance.interests_json, key=itemgetter('name'))
+
+        return super().get_attribute(instance)
+
+
 class InterestSerializer(serializers.ModelSerializer):
     class Meta:
         model = Interest
         fields = ['id', 'name', 'slug']
         read_only_fields = ['id', 'slug']
+        list_serializer_class = InterestListSerializer
+
+
+class InterestPrimaryKeyField(serializers.PrimaryKeyRelatedField):
+    def to_internal_value(self, data):
+        # Validated against the in-process catalog snapshot instead of a query per id
+        if isinstance(data, bool):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+
+        try:
+            interest = InterestCatalog.get().by_id.get(int(data))
+        except (TypeError, ValueError):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+
+        if interest is None:
+            self.fail('does_not_exist', pk_value=data)
+
+        return interest
 
 
 class ProfileImageUploadSerializer(serializers.ModelSerializer):
@@ -36,7 +67,7 @@ class ProfileImageUploadSerializer(serializers.ModelSerializer):
 class ProfileSerializer(serializers.ModelSerializer):
     profile_picture_url = serializers.SerializerMethodField()
     interests = InterestSerializer(many=True, read_only=True)
-    interest_ids = serializers.PrimaryKeyRelatedField(
+    interest_ids = InterestPrimaryKeyField(
         many=True,
         queryset=Interest.objects.all(),
         write_only=True,
@@ -86,10 +117,17 @@ class ProfileSerializer(serializers.ModelSerializer):
 
     def update(self, instance, validated_data):
         interests = validated_data.pop('interests', None)
-        instance = super().update(instance, validated_data)
+
+        try:
+            instance = super().update(instance, validated_data)
+        except IntegrityError:
+            # Two requests can both pass the username check; the unique column
+            # (the directory's when sharded) decides which one keeps it
+            raise serializers.ValidationError({'username': _("This username is already taken.")})
         
         if interests is not None:
             instance.interests.set(interests)
+            instance.interests_json = InterestSerializer(interests, many=True).data
         
         return instance
 
@@ -169,8 +207,8 @@ class ProfileInterestSerializer(serializers.Serializer):
                 _(f'You cannot add more than {Profile.MAX_INTERESTS} interests.')
             )
         
-        existing_interests = Interest.objects.filter(id__in=value)
-        if len(existing_interests) != len(value):
+        catalog = InterestCatalog.get().by_id
+        if len({interest_id for interest_id in value if interest_id in catalog}) != len(value):
             raise serializers.ValidationError(_('Some interests do not exist.'))
         
         return value
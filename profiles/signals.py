@@ -1,21 +1,25 @@
 import logging
 from django.conf import settings
-from django.db.models.signals import post_save, pre_delete
+from django.db import DEFAULT_DB_ALIAS, transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete, pre_save
 from django.dispatch import receiver
+from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
-from .models import Profile
+from config import sharding
+from .caching import InterestCatalogVersion, PublicProfileCache
+from .models import Interest, Profile
 
 
 logger = logging.getLogger('profiles')
 
 
 @receiver(post_save, sender=settings.AUTH_USER_MODEL)
-def handle_user_signup(sender, instance, created, **kwargs):
+def handle_user_signup(sender, instance, created, using, **kwargs):
     if not created:
         return
 
     try:
-        profile = Profile.objects.create(user=instance, is_host=False)
+        profile = Profile.objects.db_manager(using).create(user=instance, is_host=False)
 
         logger.info(
             str(_('Profile created for new user')),
@@ -55,3 +59,102 @@ def delete_profile_picture_on_profile_delete(sender, instance, **kwargs):
                 'error': str(e),
             },
         )
+
+
+@receiver(post_save, sender=Interest)
+def mirror_interest_to_shards(sender, instance, using, **kwargs):
+    # Profile interest rows on each shard reference a local copy of the catalog
+    if not sharding.is_enabled() or using != DEFAULT_DB_ALIAS:
+        return
+
+    for alias in sharding.shard_aliases():
+        Interest.objects.using(alias).update_or_create(
+            pk=instance.pk,
+            defaults={'name': instance.name, 'slug': instance.slug, 'created_at': instance.created_at}
+        )
+
+
+@receiver(post_delete, sender=Interest)
+def remove_mirrored_interest(sender, instance, using, **kwargs):
+    if not sharding.is_enabled() or using != DEFAULT_DB_ALIAS:
+        return
+
+    for alias in sharding.shard_aliases():
+        Interest.objects.using(alias).filter(pk=instance.pk).delete()
+
+
+@receiver(post_save, sender=Interest)
+@receiver(post_delete, sender=Interest)
+def bump_interest_catalog_version(sender, using, **kwargs):
+    # Bumped after commit so a snapshot rebuilt for the new version
+    # already sees the change
+    if using == DEFAULT_DB_ALIAS:
+        transaction.on_commit(InterestCatalogVersion.bump, using=using)
+
+
+@receiver(m2m_changed, sender=Profile.interests.through)
+def touch_profile_on_interests_change(sender, instance, action, reverse, pk_set, using, **kwargs):
+    # updated_at feeds the profile ETag, and interest changes do not save the profile
+    now = timezone.now()
+
+    if not reverse:
+        if action in ('post_add', 'post_remove', 'post_clear'):
+            Profile.objects.using(using).filter(pk=instance.pk).update(updated_at=now)
+            instance.updated_at = now
+        return
+
+    if action in ('post_add', 'post_remove'):
+        Profile.objects.using(using).filter(pk__in=pk_set).update(updated_at=now)
+    elif action == 'pre_clear':
+        Profile.objects.using(using).filter(interests=instance).update(updated_at=now)
+
+
+def invalidate_public_profiles(usernames, using):
+    # Dropped after commit so a concurrent miss cannot re-cache the old row
+    usernames = [username for username in usernames if username]
+
+    if usernames:
+        transaction.on_commit(lambda: PublicProfileCache.invalidate(*usernames), using=using)
+
+
+@receiver(pre_save, sender=Profile)
+def remember_previous_username(sender, instance, using, **kwargs):
+    instance._previous_username = (
+        Profile.objects.using(using).filter(pk=instance.pk).values_list('username', flat=True).first()
+        if instance.pk else None
+    )
+
+
+@receiver(post_save, sender=Profile)
+@receiver(post_delete, sender=Profile)
+def invalidate_public_profile(sender, instance, using, **kwargs):
+    invalidate_public_profiles([instance.username, getattr(instance, '_previous_username', None)], using)
+
+
+@receiver(m2m_changed, sender=Profile.interests.through)
+def invalidate_public_profile_interests(sender, instance, action, reverse, pk_set, using, **kwargs):
+    if not reverse:
+        if action in ('post_add', 'post_remove', 'post_clear'):
+            invalidate_public_profiles([instance.username], using)
+        return
+
+    if action in ('post_add', 'post_remove'):
+        profiles = Profile.objects.using(using).filter(pk__in=pk_set)
+    elif action == 'pre_clear':
+        profiles = Profile.objects.using(using).filter(interests=instance)
+    else:
+        return
+
+    invalidate_public_profiles(profiles.values_list('username', flat=True), using)
+
+
+@receiver(post_save, sender=Interest)
+@receiver(pre_delete, sender=Interest)
+def invalidate_profiles_with_interest(sender, instance, using, created=False, **kwargs):
+    # A rename or removal changes the embedded interest list of every holder;
+    # copies written to shards are covered by the write to default
+    if created or using != DEFAULT_DB_ALIAS:
+        return
+
+    for profiles in sharding.querysets_for(Profile.objects.filter(interests=instance.pk)):
+        invalidate_public_profiles(profiles.values_list('username', flat=True), profiles.db)
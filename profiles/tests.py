@@ -1,3 +1,163 @@
+from types import SimpleNamespace
+from unittest import mock
+from django.core.cache import cache
+from django.db import DatabaseError, models, transaction
 from django.test import TestCase
+from django.urls import reverse
+from rest_framework import serializers
+from rest_framework.test import APIClient
+from authentication.models import User, UserDirectory
+from . import models as profile_models
+from .caching import PublicProfileCache
+from .models import Interest, Profile
+from .serializers import ProfileSerializer
 
-# Create your tests here.
+
+class ShardedUsernameClaimTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(phone_number='09120000011')
+        self.profile = self.user.profile
+        UserDirectory.objects.create(pk=self.user.pk, phone_number=self.user.phone_number, username='sara')
+
+        # Only the profile model takes the sharded path; the tables stay on default
+        patcher = mock.patch.object(profile_models, 'sharding', SimpleNamespace(is_enabled=lambda: True))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def claimed(self, user_id=None):
+        return UserDirectory.objects.get(pk=user_id or self.user.pk).username
+
+    def test_claim_is_released_when_the_shard_write_fails(self):
+        self.profile.username = 'sara-new'
+
+        with mock.patch.object(models.Model, 'save', side_effect=DatabaseError('shard unavailable')):
+            with self.assertRaises(DatabaseError):
+                self.profile.save()
+
+        self.assertEqual(self.claimed(), 'sara')
+
+    def test_claim_is_kept_when_the_shard_write_succeeds(self):
+        self.profile.username = 'sara-new'
+        self.profile.save()
+
+        self.assertEqual(self.claimed(), 'sara-new')
+
+    def test_lost_claim_race_is_a_validation_error(self):
+        other = User.objects.create_user(phone_number='09120000012')
+        UserDirectory.objects.create(pk=other.pk, phone_number=other.phone_number, username='ali')
+        serializer = ProfileSerializer(self.profile, data={'username': 'ali'}, partial=True)
+
+        # The other request's claim lands between this one's check and its write
+        with mock.patch('authentication.directory.username_taken', return_value=False):
+            self.assertTrue(serializer.is_valid())
+            with self.assertRaises(serializers.ValidationError) as raised:
+                with transaction.atomic():
+                    serializer.save()
+
+        self.assertIn('username', raised.exception.detail)
+        self.assertEqual(self.claimed(), 'sara')
+        self.assertEqual(self.claimed(other.pk), 'ali')
+
+
+class ProfileListPaginationTests(TestCase):
+    def setUp(self):
+        for i in range(7):
+            User.objects.create_user(phone_number=f'0912000010{i}')
+
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.first())
+        self.expected = list(Profile.objects.order_by('-created_at', '-pk').values_list('pk', flat=True))
+
+    def walk(self, url, link):
+        pages = []
+
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            pages.append(response.data)
+            url = response.data[link]
+
+        return pages
+
+    def ids(self, pages):
+        return [profile['id'] for page in pages for profile in page['results']]
+
+    def test_next_links_walk_every_profile_once(self):
+        pages = self.walk(reverse('profiles:users-list') + '?page_size=3', 'next')
+
+        self.assertEqual([len(page['results']) for page in pages], [3, 3, 1])
+        self.assertEqual(self.ids(pages), self.expected)
+
+    def test_previous_links_walk_back_to_the_first_page(self):
+        last_page = self.walk(reverse('profiles:users-list') + '?page_size=3', 'next')[-1]
+        pages = self.walk(last_page['previous'], 'previous')
+
+        self.assertEqual(len(pages), 2)
+        self.assertEqual(self.ids(reversed(pages)), self.expected[:6])
+
+    def test_public_profiles_still_resolve_by_username(self):
+        profile = Profile.objects.get(pk=self.expected[0])
+        profile.username = 'sara'
+        profile.save()
+
+        self.assertEqual(self.client.get(reverse('profiles:public-profile', args=['sara'])).status_code, 200)
+
+
+class InterestListConditionalTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        Interest.objects.create(name='Chess', slug='chess')
+        Interest.objects.create(name='Art', slug='art')
+
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user(phone_number='09120000020'))
+
+    def test_unchanged_catalog_is_revalidated_with_304(self):
+        response = self.client.get(reverse('profiles:interests-list'))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([interest['slug'] for interest in response.json()], ['art', 'chess'])
+
+        revalidated = self.client.get(reverse('profiles:interests-list'), HTTP_IF_NONE_MATCH=response['ETag'])
+
+        self.assertEqual(revalidated.status_code, 304)
+        self.assertEqual(revalidated.content, b'')
+
+    def test_catalog_change_moves_the_etag(self):
+        etag = self.client.get(reverse('profiles:interests-list'))['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            Interest.objects.create(name='Music', slug='music')
+
+        response = self.client.get(reverse('profiles:interests-list'), HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+
+class PublicProfileCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+
+        user = User.objects.create_user(phone_number='09120000030')
+        Profile.objects.filter(user=user).update(username='sara', profile_picture='profiles/1/profile.jpg')
+        self.client = APIClient()
+
+    def picture_url(self, **extra):
+        response = self.client.get(reverse('profiles:public-profile', args=['sara']), **extra)
+        self.assertEqual(response.status_code, 200)
+        return response.json()['profile_picture_url']
+
+    def test_cached_body_follows_the_request_origin(self):
+        self.assertTrue(self.picture_url().startswith('http://testserver/'))
+        self.assertTrue(self.picture_url(secure=True).startswith('https://testserver/'))
+        self.assertTrue(self.picture_url().startswith('http://testserver/'))
+
+    def test_invalidation_drops_every_origin(self):
+        self.picture_url()
+        self.picture_url(secure=True)
+
+        PublicProfileCache.invalidate('sara')
+
+        self.assertIsNone(PublicProfileCache.cache().get(PublicProfileCache.key('sara')))
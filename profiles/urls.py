@@ -7,6 +7,7 @@ from .views import (
     ProfileViewSet,
     InterestViewSet,
     ProfileInterestView,
+    ProfileCacheStatusView,
 )
 
 app_name = 'profiles'
@@ -19,6 +20,9 @@ urlpatterns = [
     path('me/', ProfileRetrieveUpdateView.as_view(), name='profile-me'),
     path('me/image/', ProfileImageView.as_view(), name='profile-image'),
     path('me/interests/', ProfileInterestView.as_view(), name='profile-interests'),
-    path('<str:username>/', PublicProfileView.as_view(), name='public-profile'),
+    path('cache/status/', ProfileCacheStatusView.as_view(), name='profile-cache-status'),
+    # The router's prefixes come before the catch-all username route, which
+    # would otherwise swallow them
     path('', include(router.urls)),
+    path('<str:username>/', PublicProfileView.as_view(), name='public-profile'),
 ]
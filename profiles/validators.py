@@ -31,7 +31,7 @@ def validate_username(value):
             _('Username cannot start with a number.')
         )
 
-    reserved_usernames = ['admin', 'api', 'www', 'mail', 'root', 'system']
+    reserved_usernames = ['admin', 'api', 'www', 'mail', 'root', 'system', 'users', 'interests']
     if value.lower() in reserved_usernames:
         raise ValidationError(
             _('This username is reserved and cannot be used.')
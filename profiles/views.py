@@ -1,16 +1,26 @@
+from operator import attrgetter
 from django.db import IntegrityError
+from django.http import Http404, HttpResponse
 from django.shortcuts import get_object_or_404
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date
 from django.contrib.auth import get_user_model
 from django.utils.translation import gettext_lazy as _
 from rest_framework import generics, status, viewsets
 from rest_framework import serializers as drf_serializers
 from rest_framework.views import APIView
 from rest_framework.decorators import action
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.permissions import IsAdminUser, IsAuthenticated
+from rest_framework.renderers import JSONRenderer
 from rest_framework.response import Response
 from rest_framework.parsers import MultiPartParser, FormParser, JSONParser
 from rest_framework.throttling import UserRateThrottle
+from authentication import directory
+from config import sharding
+from config.db import run_in_write_transaction
+from .caching import InterestCatalog, PublicProfileCache, profile_validators
 from .models import Profile, Interest
+from .pagination import KeysetPagination
 from .serializers import (
     ProfileSerializer,
     ProfileDetailSerializer,
@@ -24,7 +34,44 @@ from .serializers import (
 User = get_user_model()
 
 
-class ProfileRetrieveUpdateView(generics.RetrieveUpdateAPIView):    
+def apply_validators(response, etag, last_modified, cache_control):
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(last_modified)
+    patch_cache_control(response, **cache_control)
+    return response
+
+
+class ConditionalRetrieveMixin:
+    cache_control = {'no_cache': True}
+
+    def get_version(self):
+        raise NotImplementedError
+
+    def get_validator_extra(self):
+        return ()
+
+    def set_validators(self, response, etag, last_modified):
+        return apply_validators(response, etag, last_modified, self.cache_control)
+
+    def retrieve(self, request, *args, **kwargs):
+        # A (pk, updated_at) lookup answers revalidations before the profile
+        # is loaded, prefetched or serialized
+        version = self.get_version()
+
+        if version is not None:
+            etag, last_modified = profile_validators(*version, *self.get_validator_extra())
+            response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+            if response is not None:
+                return self.set_validators(response, etag, last_modified)
+
+        instance = self.get_object()
+        serializer = self.get_serializer(instance)
+        etag, last_modified = profile_validators(instance.pk, instance.updated_at, *self.get_validator_extra())
+        return self.set_validators(Response(serializer.data), etag, last_modified)
+
+
+class ProfileRetrieveUpdateView(ConditionalRetrieveMixin, generics.RetrieveUpdateAPIView):
+    cache_control = {'no_cache': True, 'private': True}
     serializer_class = ProfileSerializer
     permission_classes = [IsAuthenticated]
     parser_classes = [JSONParser, MultiPartParser, FormParser]
@@ -36,6 +83,13 @@ class ProfileRetrieveUpdateView(generics.RetrieveUpdateAPIView):
         )
         return profile
 
+    def get_version(self):
+        return Profile.objects.filter(user=self.request.user).values_list('pk', 'updated_at').first()
+
+    def get_validator_extra(self):
+        # The detail serializer also exposes the user's phone number
+        return (self.request.user.phone_number,)
+
     def get_serializer_class(self):
         if self.request.method == 'GET':
             return ProfileDetailSerializer
@@ -46,6 +100,9 @@ class ProfileRetrieveUpdateView(generics.RetrieveUpdateAPIView):
         context['request'] = self.request
         return context
 
+    def perform_update(self, serializer):
+        run_in_write_transaction(serializer.save)
+
 
 class ProfileImageUploadThrottle(UserRateThrottle):
     rate = '10/hour'
@@ -98,7 +155,7 @@ class ProfileImageView(APIView):
         return Response(status=status.HTTP_204_NO_CONTENT)
 
 
-class PublicProfileView(generics.RetrieveAPIView):
+class PublicProfileView(ConditionalRetrieveMixin, generics.RetrieveAPIView):
     serializer_class = PublicProfileSerializer
     permission_classes = []
     lookup_field = 'username'
@@ -107,9 +164,46 @@ class PublicProfileView(generics.RetrieveAPIView):
     def get_queryset(self):
         return Profile.objects.filter(username__isnull=False).exclude(username='').with_public_details()
 
-    def get_object(self):
+    def get_lookup_queryset(self):
         username = self.kwargs.get('username', '').lower()
-        return get_object_or_404(self.get_queryset(), username__iexact=username)
+        queryset = self.get_queryset()
+
+        if sharding.is_enabled():
+            user_id = directory.user_id_for_username(username)
+            if user_id is None:
+                raise Http404
+            queryset = queryset.using(sharding.shard_for_key(user_id))
+
+        return queryset.filter(username__iexact=username)
+
+    def get_object(self):
+        return get_object_or_404(self.get_lookup_queryset())
+
+    def render_entry(self):
+        try:
+            instance = self.get_object()
+        except Http404:
+            return None
+
+        etag, last_modified = profile_validators(instance.pk, instance.updated_at)
+        return etag, last_modified, JSONRenderer().render(self.get_serializer(instance).data)
+
+    def retrieve(self, request, *args, **kwargs):
+        # The rendered body is cached with its validators, so both hits and
+        # revalidations are answered without touching the database
+        origin = f'{request.scheme}://{request.get_host()}'
+        entry = PublicProfileCache.get_or_render(self.kwargs.get('username', ''), origin, self.render_entry)
+
+        if entry is None:
+            raise Http404
+
+        etag, last_modified, content = entry
+        response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+
+        if response is None:
+            response = HttpResponse(content, content_type='application/json')
+
+        return self.set_validators(response, etag, last_modified)
 
 
 class ProfileViewSet(viewsets.ReadOnlyModelViewSet):
@@ -117,6 +211,24 @@ class ProfileViewSet(viewsets.ReadOnlyModelViewSet):
     serializer_class = ProfileDetailSerializer
     permission_classes = [IsAuthenticated]
     http_method_names = ['get', 'head', 'options']
+    pagination_class = KeysetPagination
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+
+        if self.action == 'list':
+            queryset = queryset.order_by(*self.pagination_class.ordering)
+
+            if sharding.is_enabled():
+                return sharding.ScatterGather(queryset, key=attrgetter('created_at', 'pk'), descending=True)
+
+            return queryset
+
+        if not sharding.is_enabled():
+            return queryset
+
+        # Sharded profiles carry their user's id, which names the shard
+        return queryset.using(sharding.shard_for_key(self.kwargs[self.lookup_url_kwarg or self.lookup_field]))
 
 
 class InterestViewSet(viewsets.ReadOnlyModelViewSet):
@@ -125,38 +237,64 @@ class InterestViewSet(viewsets.ReadOnlyModelViewSet):
     permission_classes = [IsAuthenticated]
     http_method_names = ['get', 'head', 'options']
 
+    def list(self, request, *args, **kwargs):
+        # The catalog is pre-rendered once per version and shared by every request
+        snapshot = InterestCatalog.get()
+        response = get_conditional_response(request, etag=snapshot.etag, last_modified=snapshot.last_modified)
+
+        if response is None:
+            response = HttpResponse(snapshot.content, content_type='application/json')
+
+        return apply_validators(response, snapshot.etag, snapshot.last_modified, {'no_cache': True})
+
+    def retrieve(self, request, *args, **kwargs):
+        try:
+            interest = InterestCatalog.get().by_id[int(kwargs[self.lookup_field])]
+        except (KeyError, ValueError):
+            raise Http404
+
+        return Response(self.get_serializer(interest).data)
+
 
 class ProfileInterestView(APIView):
     permission_classes = [IsAuthenticated]
 
     def get_object(self):
-        profile, created = Profile.objects.with_full_details().get_or_create(
+        profile, created = Profile.objects.with_interests_json().get_or_create(
             user=self.request.user,
             defaults={'user': self.request.user}
         )
+        if created:
+            profile.interests_json = []
         return profile
 
+    def interests_response(self, interest_ids):
+        # The profile's interests were loaded with it and the catalog is in
+        # process, so the response needs no further query
+        catalog = InterestCatalog.get().by_id
+        interests = sorted(
+            (catalog[interest_id] for interest_id in interest_ids if interest_id in catalog),
+            key=attrgetter('name')
+        )
+        return Response(InterestSerializer(interests, many=True).data, status=status.HTTP_200_OK)
+
     def post(self, request, *args, **kwargs):
         profile = self.get_object()
         serializer = ProfileInterestSerializer(data=request.data)
         serializer.is_valid(raise_exception=True)
         
         interest_ids = serializer.validated_data['interest_ids']
-        current_count = profile.interests.count()
+        current_ids = {interest['id'] for interest in profile.interests_json}
         
-        if current_count + len(interest_ids) > Profile.MAX_INTERESTS:
+        if len(current_ids) + len(interest_ids) > Profile.MAX_INTERESTS:
             return Response(
                 {'detail': _(f'You cannot have more than {Profile.MAX_INTERESTS} interests.')},
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        interests = Interest.objects.filter(id__in=interest_ids)
-        profile.interests.add(*interests)
+        profile.interests.add(*interest_ids)
         
-        return Response(
-            InterestSerializer(profile.interests.all(), many=True).data,
-            status=status.HTTP_200_OK
-        )
+        return self.interests_response(current_ids | set(interest_ids))
 
     def delete(self, request, *args, **kwargs):
         profile = self.get_object()
@@ -164,10 +302,16 @@ class ProfileInterestView(APIView):
         serializer.is_valid(raise_exception=True)
         
         interest_ids = serializer.validated_data['interest_ids']
-        interests = Interest.objects.filter(id__in=interest_ids)
-        profile.interests.remove(*interests)
+        profile.interests.remove(*interest_ids)
         
+        return self.interests_response({interest['id'] for interest in profile.interests_json} - set(interest_ids))
+
+
+class ProfileCacheStatusView(APIView):
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
         return Response(
-            InterestSerializer(profile.interests.all(), many=True).data,
+            {'public_profiles': PublicProfileCache.get_stats()},
             status=status.HTTP_200_OK
         )